@@ -0,0 +1,180 @@
+import re
+
+import asyncpg
+from config import DB_CONFIG, DB_POOL_CONFIG
+from database_manager import (
+    DatabaseManager,
+    GET_QUESTION_SQL,
+    GET_QUESTIONS_SQL,
+    SET_TRGM_THRESHOLDS_SQL,
+    STATS_SQL
+)
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+
+def to_asyncpg(query, params=()):
+    """
+    Convert a psycopg2-style query (%s, %(name)s, %%) into asyncpg's $n form.
+
+    Returns:
+        Tuple of (query, args) ready for asyncpg's fetch/execute
+    """
+    args = []
+    named = {}
+    positional = iter(params) if not isinstance(params, dict) else None
+
+    def replace(match):
+        token = match.group(0)
+        if token == "%%":
+            return "%"
+        name = match.group(1)
+        if name is None:
+            args.append(next(positional))
+            return f"${len(args)}"
+        if name not in named:
+            args.append(params[name])
+            named[name] = len(args)
+        return f"${named[name]}"
+
+    return _PLACEHOLDER.sub(replace, query), args
+
+class AsyncDatabaseManager:
+    """
+    asyncio read path over an asyncpg pool.
+    Mirrors the read methods of DatabaseManager and shares its SQL, so async
+    endpoints return the same payloads without occupying threadpool slots.
+    """
+    def __init__(self, pool):
+        self.pool = pool
+
+    @classmethod
+    async def create(cls, dbname=None, user=None, password=None, host=None, port=None,
+                     min_size=None, max_size=None):
+        pool = await asyncpg.create_pool(
+            database=dbname or DB_CONFIG['dbname'],
+            user=user or DB_CONFIG['user'],
+            password=password or DB_CONFIG['password'],
+            host=host or DB_CONFIG['host'],
+            port=port or DB_CONFIG['port'],
+            min_size=min_size or DB_POOL_CONFIG['minconn'],
+            max_size=max_size or DB_POOL_CONFIG['maxconn'],
+            timeout=DB_POOL_CONFIG['timeout']
+        )
+        return cls(pool)
+
+    async def get_question(self, question_id):
+        query, args = to_asyncpg(GET_QUESTION_SQL, (question_id,))
+        row = await self.pool.fetchrow(query, *args)
+        if not row:
+            return None
+        return DatabaseManager._question_from_row(row)
+
+    async def get_questions(self, question_ids):
+        """
+        Get multiple questions by their IDs.
+
+        Returns:
+            Dictionary containing list of question dictionaries
+        """
+        if not question_ids:
+            return {"questions": []}
+
+        try:
+            query, args = to_asyncpg(GET_QUESTIONS_SQL, (list(question_ids),))
+            rows = await self.pool.fetch(query, *args)
+            return {"questions": [DatabaseManager._question_from_row(row) for row in rows]}
+        except asyncpg.PostgresError as e:
+            print(f"Error fetching questions: {e}")
+            return {"questions": []}
+
+    async def get_all_questions(self, limit=None, offset=0, cursor=None):
+        return await self.filter_questions(limit=limit, offset=offset, cursor=cursor)
+
+    async def filter_questions(self, tags=None, difficulty=None, language=None, question_type=None, limit=None, offset=0, cursor=None):
+        """
+        Filter questions based on various criteria (see DatabaseManager.filter_questions).
+        """
+        try:
+            query, params = DatabaseManager._build_filter_query(
+                tags=tags,
+                difficulty=difficulty,
+                language=language,
+                question_type=question_type,
+                limit=limit,
+                offset=offset,
+                cursor=cursor
+            )
+            query, args = to_asyncpg(query, params)
+            rows = await self.pool.fetch(query, *args)
+            return [DatabaseManager._question_from_row(row) for row in rows]
+        except asyncpg.PostgresError as e:
+            print(f"Error filtering questions: {e}")
+            return []
+
+    async def search_questions(self, search_query, limit=10, tags=None, difficulty=None, language=None, question_type=None):
+        """
+        Ranked full-text search (see DatabaseManager.search_questions).
+        """
+        query, params = DatabaseManager._build_search_query(
+            search_query, limit, tags=tags, difficulty=difficulty, language=language, question_type=question_type
+        )
+        if query is None:
+            return []
+
+        try:
+            query, args = to_asyncpg(query, params)
+            rows = await self.pool.fetch(query, *args)
+        except asyncpg.PostgresError as e:
+            print(f"Error executing search query: {e}")
+            return []
+
+        results = []
+        for row in rows:
+            question_dict = DatabaseManager._question_from_row(row)
+            question_dict['rank'] = float(question_dict['rank'])
+            results.append(question_dict)
+        return results
+
+    async def fuzzy_search_questions(self, search_query, limit=10, threshold=0.3, tags=None, difficulty=None, language=None,
+                                     question_type=None):
+        """
+        Typo-tolerant trigram search (see DatabaseManager.fuzzy_search_questions).
+        """
+        if not search_query or not search_query.strip():
+            return []
+
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    # Thresholds are transaction-local so pooled connections are left untouched
+                    query, args = to_asyncpg(SET_TRGM_THRESHOLDS_SQL, (str(threshold), str(threshold)))
+                    await conn.execute(query, *args)
+                    query, params = DatabaseManager._build_fuzzy_search_query(
+                        search_query, limit, tags=tags, difficulty=difficulty, language=language, question_type=question_type
+                    )
+                    query, args = to_asyncpg(query, params)
+                    rows = await conn.fetch(query, *args)
+        except asyncpg.PostgresError as e:
+            print(f"Error executing fuzzy search query: {e}")
+            return []
+
+        results = []
+        for row in rows:
+            question_dict = DatabaseManager._question_from_row(row)
+            question_dict['score'] = float(question_dict['score'])
+            results.append(question_dict)
+        return results
+
+    async def get_stats(self):
+        """
+        Get comprehensive statistics about the question database.
+        """
+        try:
+            rows = await self.pool.fetch(STATS_SQL)
+            return DatabaseManager._stats_from_rows(rows)
+        except asyncpg.PostgresError as e:
+            print(f"Error getting statistics: {e}")
+            return {}
+
+    async def close(self):
+        await self.pool.close()
@@ -1,15 +1,26 @@
-from fastapi import FastAPI , UploadFile, Form, File, HTTPException
+from fastapi import FastAPI , UploadFile, Form, File, HTTPException, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from schemas import Question , QuestionId, QuestionUpdate , RedundantQuestion, RedundantDataCheck, ExportRequest
-from database_manager import DatabaseManager
-from vector_database import VectorDatabase
+from schemas import Question , BulkQuestions, QuestionId, QuestionUpdate , RedundantQuestion, RedundantDataCheck, ExportRequest, ReindexRequest, DuplicateGraphBackfillRequest
+from database_manager import DatabaseManager, DIFFICULTY_VALUES, QUESTION_TYPE_VALUES, encode_cursor, decode_cursor
+from vector_database import VectorDatabase, build_vector_metadata, build_vector_text
+from reindex import reindex, reindex_status, load_checkpoint
+from reconcile import reconcile, load_state
+from duplicate_graph import backfill_duplicate_graph, backfill_status, record_duplicates as record_question_duplicates
 from pdfexcelgen import PDFExcelGen
-from config import DB_CONFIG
+from redundancy import group_duplicate_pairs, keep_nearest_pairs
+from rank_fusion import reciprocal_rank_fusion
+from minhash_index import MinHashIndex
+from config import DB_CONFIG, RECONCILE_INTERVAL, DUPLICATE_MAX_DISTANCE, OCR_MAX_WORKERS
+import asyncio
 import json
 import os
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from question_generator import QuestionGenerator
 from helpers import gemini_ocr
 from typing import List, Optional
@@ -28,12 +39,16 @@ app.add_middleware(
 
 # Initialize database and other services
 db = None
+adb = None
 vd = None
+mh = None
 pdf_excel_gen = None
+minhash_sync_lock = threading.Lock()
+minhash_rebuild_lock = threading.Lock()  # One full rebuild at a time; writes only wait for the swap
 
 def initialize_services():
     """Initialize services with proper error handling"""
-    global db, vd, pdf_excel_gen
+    global db, vd, mh, pdf_excel_gen
     
     # Initialize database
     try:
@@ -47,10 +62,25 @@ def initialize_services():
     try:
         vd = VectorDatabase()
         print("✓ Vector database initialized successfully")
+        stale_models = vd.stored_embedding_models() - {vd.embedding_model}
+        if stale_models:
+            models = sorted("unrecorded (older vectors)" if model is None else model for model in stale_models)
+            print(
+                f"⚠ Stored vectors were embedded with {models}, not {vd.embedding_model}; "
+                f"run a reindex (python reindex.py or POST /reindex) before relying on search"
+            )
     except Exception as e:
         print(f"⚠ Vector database initialization failed (optional): {e}")
         vd = None
     
+    # Load the MinHash near-duplicate index (optional)
+    try:
+        mh = MinHashIndex.load()
+        print(f"✓ MinHash index loaded ({len(mh)} questions)")
+    except Exception as e:
+        print(f"⚠ MinHash index initialization failed (optional): {e}")
+        mh = None
+    
     # Initialize PDF/Excel generator
     try:
         pdf_excel_gen = PDFExcelGen(output_directory="./exports")
@@ -62,6 +92,58 @@ def initialize_services():
 # Initialize services on startup
 initialize_services()
 
+@app.on_event("startup")
+async def initialize_async_services():
+    """Create the asyncpg pool used by the read endpoints (optional)"""
+    global adb
+    try:
+        from async_database_manager import AsyncDatabaseManager
+        adb = await AsyncDatabaseManager.create()
+        print("✓ Async database pool initialized successfully")
+    except Exception as e:
+        print(f"⚠ Async database initialization failed (optional), reads will use the threadpool: {e}")
+        adb = None
+
+async def reconcile_periodically():
+    """Repair Postgres/vector database drift every RECONCILE_INTERVAL seconds"""
+    while True:
+        await asyncio.sleep(RECONCILE_INTERVAL)
+        if db is None or vd is None:
+            continue
+        try:
+            summary = await run_in_threadpool(reconcile, db, vd)
+            print(f"Reconcile complete: {summary}")
+        except Exception as e:
+            print(f"Reconcile failed: {e}")
+
+@app.on_event("startup")
+async def start_reconciler():
+    if RECONCILE_INTERVAL > 0:
+        app.state.reconciler = asyncio.create_task(reconcile_periodically())
+
+@app.on_event("shutdown")
+async def close_async_services():
+    reconciler = getattr(app.state, "reconciler", None)
+    if reconciler is not None:
+        reconciler.cancel()
+    if adb is not None:
+        await adb.close()
+    if mh is not None:
+        try:
+            await run_in_threadpool(mh.save)
+        except Exception as e:
+            print(f"Saving MinHash index failed: {e}")
+
+async def read_db(method, *args, **kwargs):
+    """
+    Run a read on the asyncpg manager when available, otherwise run the same
+    method of the pooled sync DatabaseManager in the threadpool.
+    """
+    if adb is not None:
+        return await getattr(adb, method)(*args, **kwargs)
+    check_services()
+    return await run_in_threadpool(getattr(db, method), *args, **kwargs)
+
 @app.get("/health")
 def health_check():
     """Health check endpoint for Docker and monitoring"""
@@ -70,7 +152,7 @@ def health_check():
             raise HTTPException(status_code=503, detail="Database not initialized")
         
         # Test database connection
-        db.cursor.execute("SELECT 1")
+        db.ping()
         db_status = "connected"
     except Exception as e:
         db_status = f"error: {str(e)}"
@@ -78,6 +160,7 @@ def health_check():
     return {
         "status": "healthy" if db_status == "connected" else "unhealthy",
         "database": db_status,
+        "pool": db.pool_stats() if db is not None else None,
         "config": {
             "db_host": DB_CONFIG['host'],
             "db_port": DB_CONFIG['port'],
@@ -98,6 +181,121 @@ def check_optional_services():
         "pdf_generator": pdf_excel_gen is not None
     }
 
+# Question fields that make up the vector database text and its filterable metadata
+EMBEDDED_FIELDS = {"question", "solution", "tags"}
+VECTOR_METADATA_FIELDS = {"difficulty", "question_type", "language", "image_required", "tags"}
+
+def build_vector_where(tags=None, difficulty=None, language=None, question_type=None):
+    """
+    Chroma where clause for the same filters (and spellings) accepted by filter_questions.
+    """
+    return VectorDatabase.build_where(
+        tags=tags,
+        difficulties=DatabaseManager._normalize_filter_values(difficulty, DIFFICULTY_VALUES),
+        languages=DatabaseManager._normalize_filter_values(language),
+        question_types=DatabaseManager._normalize_filter_values(question_type, QUESTION_TYPE_VALUES)
+    )
+
+def parse_tags(tags):
+    """Split a comma-separated tags parameter into a list (None if empty)"""
+    if not tags:
+        return None
+    return [tag.strip() for tag in tags.split(',') if tag.strip()] or None
+
+def record_duplicates(question_ids, texts):
+    """
+    Refresh the duplicate graph edges of just-written questions (see duplicate_graph.record_duplicates).
+    """
+    if vd is None or not question_ids:
+        return
+    try:
+        record_question_duplicates(db, vd, question_ids, texts)
+    except Exception as e:
+        print(f"Duplicate check failed: {e}")
+
+def annotate_existing_matches(questions, k=3):
+    """
+    Attach the closest questions already in the bank to each generated question,
+    using one batched embedding pass and vector query plus one hydration query.
+    Each question gets "similar_questions" (question_id, question, distance, nearest
+    first) and "possible_duplicate" (a match within DUPLICATE_MAX_DISTANCE).
+    """
+    if vd is None or not questions:
+        return questions
+    try:
+        matches = vd.nearest_neighbours([build_vector_text(question) for question in questions], k=k)
+        match_ids = list(dict.fromkeys(int(doc_id) for neighbours in matches for doc_id, _ in neighbours if str(doc_id).isdigit()))
+        existing = {}
+        if match_ids:
+            existing = {question["question_id"]: question for question in db.get_questions(match_ids)["questions"]}
+        for question, neighbours in zip(questions, matches):
+            question["similar_questions"] = [
+                {"question_id": int(doc_id), "question": existing[int(doc_id)]["question"], "distance": distance}
+                for doc_id, distance in neighbours
+                if str(doc_id).isdigit() and int(doc_id) in existing
+            ]
+            question["possible_duplicate"] = any(
+                match["distance"] <= DUPLICATE_MAX_DISTANCE for match in question["similar_questions"]
+            )
+    except Exception as e:
+        print(f"Matching generated questions failed: {e}")
+    return questions
+
+def build_minhash_text(question):
+    """Text compared by the MinHash near-duplicate index"""
+    return question['question']
+
+def update_minhash_index(questions=(), removed_ids=()):
+    """
+    Keep the MinHash index in step with the write this thread just made through
+    this API. The index stays marked current only if it reflected the bank
+    version right before that write; writes made by other workers or requests
+    in between leave it marked stale, so sync_minhash_index rebuilds it.
+    """
+    if mh is None:
+        return
+    version_change = db.last_version_change()
+    with minhash_sync_lock:
+        try:
+            in_sync = version_change is not None and mh.bank_version == version_change[0]
+            mh.remove_many(removed_ids)
+            mh.add_many(
+                [question["question_id"] for question in questions],
+                [build_minhash_text(question) for question in questions]
+            )
+            mh.bank_version = version_change[1] if in_sync else None
+        except Exception as e:
+            print(f"MinHash index update failed: {e}")
+            mh.bank_version = None
+
+def sync_minhash_index(bank_version):
+    """
+    Rebuild the MinHash index from the database when it does not reflect
+    bank_version (first use, or questions changed outside this API), then persist it.
+    The bank is streamed without holding minhash_sync_lock, so writes are not
+    blocked by a rebuild; if any arrive meanwhile, the swapped-in index is
+    marked stale and the next sync rebuilds it again.
+    """
+    global mh
+    with minhash_rebuild_lock:
+        with minhash_sync_lock:
+            if mh.bank_version == bank_version:
+                return
+        started_version = db.get_bank_version()
+        rebuilt = MinHashIndex(num_perm=mh.num_perm, bands=mh.bands)
+        for batch in db.stream_questions(batch_size=5000):
+            rebuilt.add_many(
+                [question["question_id"] for question in batch],
+                [build_minhash_text(question) for question in batch]
+            )
+        rebuilt.bank_version = started_version
+        rebuilt.save()
+        with minhash_sync_lock:
+            # Writes made during the rebuild may be missing from it
+            if db.get_bank_version() != started_version:
+                rebuilt.bank_version = None
+            mh = rebuilt
+
 @app.get("/")
 def read_root():
     return {"message": "Indian Navy Question Bank API is running", "version": "1.0.0"}
@@ -110,22 +308,76 @@ def add_question(question_data: Question):
         question_id = db.insert_question(question_da)
         
         # Create a text representation for vector database
-        text_for_vector = f"Question: {question_da['question']} Solution: {question_da.get('solution', '')} Tags: {', '.join(question_da.get('tags', []))}"
+        text_for_vector = build_vector_text(question_da)
         
         # Add to vector database if available
         if vd is not None:
             try:
-                vd.insert(text=text_for_vector, id=question_id)
+                vd.insert(text=text_for_vector, id=question_id, metadata=build_vector_metadata(question_da))
+                record_duplicates([question_id], [text_for_vector])
             except Exception as ve:
                 print(f"Vector database insert failed: {ve}")
                 # Continue without vector database if it fails
         else:
             print("Vector database not available, skipping vector insert")
         
+        update_minhash_index(questions=[{**question_da, "question_id": question_id}])
+        
         return {"question_id": question_id , "question_data" : question_data}
     except Exception as e:
         print(f"Error adding question: {e}")
         return {"error": f"Failed to add question: {str(e)}"}
+@app.post("/add-questions")
+def add_questions(data: BulkQuestions):
+    """
+    Add many questions in one request.
+    Questions and tags are written in a single transaction and all inserted
+    questions are embedded and upserted into the vector database in one batch.
+    Returns a result for every submitted question, in order.
+    """
+    check_services()
+    try:
+        questions_data = [question.dict() for question in data.questions]
+        results = db.insert_questions(questions_data)
+        
+        inserted = [result for result in results if result["status"] == "inserted"]
+        indexed_ids = set()
+        if vd is not None and inserted:
+            try:
+                vector_result = vd.upsert_many(
+                    ids=[result["question_id"] for result in inserted],
+                    texts=[build_vector_text(questions_data[result["index"]]) for result in inserted],
+                    metadatas=[build_vector_metadata(questions_data[result["index"]]) for result in inserted]
+                )
+                indexed_ids = set(vector_result["upserted"])
+                indexed = [result for result in inserted if str(result["question_id"]) in indexed_ids]
+                record_duplicates(
+                    [result["question_id"] for result in indexed],
+                    [build_vector_text(questions_data[result["index"]]) for result in indexed]
+                )
+            except Exception as ve:
+                print(f"Vector database bulk insert failed: {ve}")
+                # Continue without vector database if it fails
+        elif vd is None:
+            print("Vector database not available, skipping vector insert")
+        
+        for result in inserted:
+            result["vector_indexed"] = str(result["question_id"]) in indexed_ids
+        
+        update_minhash_index(questions=[
+            {**questions_data[result["index"]], "question_id": result["question_id"]}
+            for result in inserted
+        ])
+        
+        return {
+            "total": len(results),
+            "inserted": len(inserted),
+            "failed": len(results) - len(inserted),
+            "results": results
+        }
+    except Exception as e:
+        print(f"Error adding questions: {e}")
+        return {"error": f"Failed to add questions: {str(e)}"}
 @app.post("/delete-question")
 def delete_questions(data : QuestionId):
     try:
@@ -141,14 +393,16 @@ def delete_questions(data : QuestionId):
                 # Continue without vector database if it fails
         else:
             print("Vector database not available, skipping vector delete")
+        
+        update_minhash_index(removed_ids=[question_id])
             
         return {"message": f"Question with ID {question_id} deleted successfully."}
     except Exception as e:
         print(f"Error deleting question: {e}")
         return {"error": f"Failed to delete question: {str(e)}"}
 @app.get("/get-question/{question_id}")
-def get_question(question_id: int):
-    question = db.get_question(question_id)
+async def get_question(question_id: int):
+    question = await read_db("get_question", question_id)
     if question:
         return {"question": question}
     return {"message": f"Question with ID {question_id} not found."}
@@ -162,19 +416,27 @@ def update_question(question_id: int, update_data: QuestionUpdate):
         
         db.update_question(question_id, update_dict)
         
-        # Get the full updated question for vector database update
-        if vd is not None:
+        # Get the full updated question for vector database update. Only the
+        # embedded text and the filterable metadata live there, so other edits skip it.
+        if vd is not None and (EMBEDDED_FIELDS | VECTOR_METADATA_FIELDS).intersection(update_dict):
             try:
                 updated_question = db.get_question(question_id)
                 if updated_question:
-                    text_for_vector = f"Question: {updated_question['question']} Solution: {updated_question.get('solution', '')} Tags: {', '.join(updated_question.get('tags', []))}"
-                    vd.update_question(id=question_id, text=text_for_vector)
+                    text_for_vector = build_vector_text(updated_question)
+                    # Only a re-embedded question can have new neighbours
+                    if vd.update_question(id=question_id, text=text_for_vector, metadata=build_vector_metadata(updated_question)):
+                        record_duplicates([question_id], [text_for_vector])
             except Exception as ve:
                 print(f"Vector database update failed: {ve}")
                 # Continue without vector database if it fails
-        else:
+        elif vd is None:
             print("Vector database not available, skipping vector update")
         
+        if "question" in update_dict:
+            update_minhash_index(questions=[{"question_id": question_id, "question": update_dict["question"]}])
+        else:
+            update_minhash_index()
+        
         return {"message": f"Question with ID {question_id} updated successfully."}
     except Exception as e:
         print(f"Error updating question: {e}")
@@ -182,23 +444,51 @@ def update_question(question_id: int, update_data: QuestionUpdate):
 @app.post("/upload-file/generate-questions/")
 def upload_file_generate_questions(
     files: List[UploadFile] = File(...),
-    text: Optional[str] = Form(None)
+    text: Optional[str] = Form(None),
+    match_count: int = Form(3)
 ):
+    """
+    Extract text from the uploaded files (and optional manual text), generate
+    questions from it, and annotate each generated question with its
+    match_count closest existing questions so duplicates are caught before insert.
+    Files are OCR'd concurrently (up to OCR_MAX_WORKERS at a time); their text is
+    combined in upload order and per-file timings and errors are returned in "files".
+    """
     combined_text = ""
     temp_file_paths = []
     
+    def ocr_file(temp_file_path):
+        started = time.monotonic()
+        try:
+            return gemini_ocr(temp_file_path), None, time.monotonic() - started
+        except Exception as e:
+            return None, str(e), time.monotonic() - started
+    
     try:
-        # Process each uploaded file
+        # Save each uploaded file to a temporary file
         for file in files:
-            # Create a temporary file for each uploaded file
             with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
                 content = file.file.read()
                 temp_file.write(content)
-                temp_file_path = temp_file.name
-                temp_file_paths.append(temp_file_path)
-            
-            # Extract text using Gemini OCR for each file
-            extracted_text = gemini_ocr(temp_file_path)
+                temp_file_paths.append(temp_file.name)
+        
+        # Extract text using Gemini OCR, several files at a time; map keeps upload order
+        ocr_results = []
+        if temp_file_paths:
+            with ThreadPoolExecutor(max_workers=max(1, min(OCR_MAX_WORKERS, len(temp_file_paths)))) as executor:
+                ocr_results = list(executor.map(ocr_file, temp_file_paths))
+        
+        file_reports = []
+        for file, (extracted_text, error, seconds) in zip(files, ocr_results):
+            file_reports.append({
+                "filename": file.filename,
+                "seconds": round(seconds, 3),
+                "characters": len(extracted_text or ""),
+                "error": error
+            })
+            if error is not None:
+                print(f"OCR failed for {file.filename}: {error}")
+                continue
             combined_text += f"\n--- Content from {file.filename} ---\n{extracted_text}\n"
         
         # Add manual text if provided
@@ -207,14 +497,18 @@ def upload_file_generate_questions(
         
         # If no content was provided at all
         if not combined_text.strip():
+            if any(report["error"] for report in file_reports):
+                return {"error": "Text could not be extracted from the uploaded files", "files": file_reports}
             return {"error": "No files or text provided"}
         
         # Pass the combined text to question generator
         question_generator = QuestionGenerator()
         questions = question_generator.generate_questions(table_specification=combined_text.strip())
         questions = json.loads(questions)  # Assuming the output is JSON formatted
+        if match_count > 0:
+            questions = annotate_existing_matches(questions, k=match_count)
         
-        return {"questions": questions, "processed_content": combined_text}
+        return {"questions": questions, "processed_content": combined_text, "files": file_reports}
     
     finally:
         # Clean up all temporary files
@@ -224,52 +518,243 @@ def upload_file_generate_questions(
 @app.post("/find-redundant-questions")
 def find_redundant_questions(data : RedundantDataCheck):
     """
-    Finds redundant questions based on vector similarity.
-    Returns a list of question IDs that are considered redundant.
+    Finds redundant questions based on vector similarity (method="vector") or
+    MinHash/LSH estimated Jaccard similarity of the question text (method="minhash").
+    threshold is a maximum distance for every method; MinHash distances are
+    1 - Jaccard similarity.
+    method="graph" reads the duplicate graph instead of rescanning the bank. The
+    graph only holds edges within DUPLICATE_MAX_DISTANCE recorded when questions
+    are written (or re-embedded by reindex/reconcile); questions that predate it
+    are only covered after a backfill (POST /duplicate-graph/backfill).
+    Near-duplicate pairs are grouped into connected clusters and each cluster
+    is returned with its full question rows. Scan reports are persisted per bank
+    version and served from storage until questions change (or refresh=true).
     """
-    if vd is None:
+    if data.method == "vector" and vd is None:
         raise HTTPException(
             status_code=503, 
             detail="Vector database service not available. Cannot check for redundant questions."
         )
+    if data.method == "minhash" and mh is None:
+        raise HTTPException(
+            status_code=503,
+            detail="MinHash index not available. Cannot check for redundant questions."
+        )
+    check_services()
     
     try:
-        redundant_ids = vd.check_redundant_data(threshold=data.threshold, n=data.n)
-        return {"redundant_question_ids": redundant_ids}
+        bank_version = db.get_bank_version()
+        # Vector reports depend on the embedding space as well as the questions
+        embedding_model = vd.embedding_model if data.method == "vector" else ""
+        report = None
+        if not data.refresh and data.method != "graph":
+            report = db.get_redundancy_report(
+                data.threshold, data.n, bank_version, method=data.method, embedding_model=embedding_model
+            )
+        cached = report is not None
+        
+        if report is None:
+            if data.method == "graph":
+                edges = db.get_duplicate_edges(max_distance=data.threshold)
+                pairs = keep_nearest_pairs([(str(id_a), str(id_b), distance) for id_a, id_b, distance in edges], n=data.n)
+            elif data.method == "minhash":
+                sync_minhash_index(bank_version)
+                pairs = mh.find_duplicate_pairs(threshold=data.threshold, n=data.n)
+            else:
+                pairs = vd.find_redundant_pairs(threshold=data.threshold, n=data.n)
+            clusters = group_duplicate_pairs(pairs)
+            report = {
+                "redundant_question_ids": [question_id for cluster in clusters for question_id in cluster["question_ids"]],
+                "redundant_pairs": [
+                    {"question_ids": [id_a, id_b], "distance": distance}
+                    for id_a, id_b, distance in pairs
+                ],
+                "clusters": clusters
+            }
+            if data.method != "graph":
+                db.save_redundancy_report(
+                    data.threshold, data.n, bank_version, report, method=data.method, embedding_model=embedding_model
+                )
+        
+        # Hydrate every clustered question with one batched query
+        question_ids = [int(question_id) for question_id in report["redundant_question_ids"] if str(question_id).isdigit()]
+        questions = {
+            str(question["question_id"]): question
+            for question in db.get_questions(question_ids)["questions"]
+        }
+        clusters = [
+            {**cluster, "questions": [questions[question_id] for question_id in cluster["question_ids"] if question_id in questions]}
+            for cluster in report["clusters"]
+        ]
+        
+        return {
+            **report,
+            "clusters": clusters,
+            "bank_version": bank_version,
+            "method": data.method,
+            "cached": cached
+        }
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error checking redundant questions: {str(e)}"
         )
 
+def run_reindex(data: ReindexRequest):
+    try:
+        summary = reindex(
+            db,
+            vd,
+            batch_size=max(1, data.batch_size),
+            workers=max(0, data.workers),
+            restart=data.restart,
+            fit_idf=data.fit_idf
+        )
+        print(f"Reindex complete: {summary}")
+    except Exception as e:
+        print(f"Reindex failed: {e}")
+
+@app.post("/reindex")
+def start_reindex(data: ReindexRequest, background_tasks: BackgroundTasks):
+    """
+    Rebuild the vector database from Postgres in the background.
+    Resumes after the last checkpointed question unless restart=true;
+    poll /reindex/status for progress.
+    """
+    check_services()
+    if vd is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Vector database service not available. Cannot reindex."
+        )
+    if reindex_status.get("running"):
+        raise HTTPException(status_code=409, detail="A reindex is already running")
+    
+    background_tasks.add_task(run_reindex, data)
+    return {"message": "Reindex started", "checkpoint": load_checkpoint()}
+
+@app.get("/reindex/status")
+def get_reindex_status():
+    """Progress of the running reindex, or the last checkpoint written"""
+    return {**(load_checkpoint() or {}), **reindex_status}
+
+@app.post("/reconcile")
+def reconcile_vector_database(full: bool = False):
+    """
+    Repair drift between Postgres and the vector database now: add missing
+    vectors, re-embed changed questions and delete orphaned vectors.
+    Only questions modified since the last run are checked unless full=true.
+    """
+    check_services()
+    if vd is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Vector database service not available. Cannot reconcile."
+        )
+    try:
+        return {"summary": reconcile(db, vd, full=full)}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reconciling vector database: {str(e)}")
+
+def run_duplicate_graph_backfill(data: DuplicateGraphBackfillRequest):
+    try:
+        summary = backfill_duplicate_graph(db, vd, batch_size=max(1, data.batch_size))
+        print(f"Duplicate graph backfill complete: {summary}")
+    except Exception as e:
+        print(f"Duplicate graph backfill failed: {e}")
+
+@app.post("/duplicate-graph/backfill")
+def start_duplicate_graph_backfill(data: DuplicateGraphBackfillRequest, background_tasks: BackgroundTasks):
+    """
+    Rebuild the near-duplicate graph for every stored question in the background,
+    so method="graph" also covers questions written before it was maintained.
+    Poll /duplicate-graph/status for progress.
+    """
+    check_services()
+    if vd is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Vector database service not available. Cannot build the duplicate graph."
+        )
+    if backfill_status.get("running"):
+        raise HTTPException(status_code=409, detail="A duplicate graph backfill is already running")
+    
+    background_tasks.add_task(run_duplicate_graph_backfill, data)
+    return {"message": "Duplicate graph backfill started"}
+
+@app.get("/duplicate-graph/status")
+def get_duplicate_graph_status():
+    """Progress of the running (or last) duplicate graph backfill in this process"""
+    return backfill_status
+
+@app.get("/reconcile/status")
+def get_reconcile_status():
+    """Watermark and summary of the last reconcile"""
+    return load_state()
+
+def parse_cursor(cursor):
+    """Decode a next_cursor token from a previous page, rejecting malformed tokens"""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def paginate(questions, limit):
+    """
+    Trim a page fetched with limit + 1 rows and build the token for the next page.
+    Returns (questions, next_cursor); next_cursor is None on the last page.
+    """
+    if limit is None:
+        return questions, None
+    if limit <= 0:
+        return questions[:0], None
+    if len(questions) <= limit:
+        return questions, None
+    questions = questions[:limit]
+    return questions, encode_cursor(questions[-1]['question_id'])
+
 @app.get("/get-all-questions")
-def get_all_questions(limit: Optional[int] = None, offset: int = 0):
+async def get_all_questions(limit: Optional[int] = Query(None, ge=0), offset: int = Query(0, ge=0), cursor: Optional[str] = None):
     """
     Get all questions from the database.
     
     Args:
         limit: Maximum number of questions to return (None for all)
         offset: Number of questions to skip (for pagination)
+        cursor: next_cursor token from the previous page (keyset pagination)
     
     Returns:
         List of all questions with their tags
     """
+    after_id = parse_cursor(cursor)
     try:
-        if db is None:
+        if db is None and adb is None:
             return {
                 "total_questions": 0,
                 "questions": [],
                 "limit": limit,
                 "offset": offset,
+                "next_cursor": None,
                 "error": "Database service not available"
             }
         
-        questions = db.get_all_questions(limit=limit, offset=offset)
+        questions = await read_db(
+            "get_all_questions",
+            limit=limit + 1 if limit is not None else None,
+            offset=offset,
+            cursor=after_id
+        )
+        questions, next_cursor = paginate(questions, limit)
         return {
             "total_questions": len(questions),
             "questions": questions,
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "next_cursor": next_cursor
         }
     except Exception as e:
         print(f"Error getting all questions: {e}")
@@ -278,63 +763,148 @@ def get_all_questions(limit: Optional[int] = None, offset: int = 0):
             "questions": [],
             "limit": limit,
             "offset": offset,
+            "next_cursor": None,
             "error": f"Failed to get questions: {str(e)}"
         }
 
 @app.get("/filter-questions")
-def filter_questions(
+async def filter_questions(
     tags: Optional[str] = None,
     difficulty: Optional[str] = None,
     language: Optional[str] = None,
     question_type: Optional[str] = None,
-    limit: Optional[int] = None,
-    offset: int = 0
+    limit: Optional[int] = Query(None, ge=0),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    query: Optional[str] = None
 ):
     """
     Filter questions based on various criteria.
     
+    With a query, the filtered questions are instead ranked by semantic
+    similarity: the filters are applied inside the vector index, so the
+    nearest matching questions are returned even if they are rare.
+    
     Args:
         tags: Comma-separated list of tags to filter by
-        difficulty: Difficulty level to filter by
-        language: Language to filter by
-        question_type: Question type to filter by
+        difficulty: Difficulty level(s) to filter by (comma-separated, case-insensitive)
+        language: Language(s) to filter by (comma-separated, case-insensitive)
+        question_type: Question type(s) to filter by (comma-separated, case-insensitive)
         limit: Maximum number of questions to return
         offset: Number of questions to skip (for pagination)
+        cursor: next_cursor token from the previous page (keyset pagination)
+        query: Optional text to rank the filtered questions by semantic similarity
     
     Returns:
         List of filtered questions with their tags
     """
+    after_id = parse_cursor(cursor)
     try:
         # Parse tags if provided
-        tag_list = None
-        if tags:
-            tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
+        tag_list = parse_tags(tags)
+        filters = {
+            "tags": tag_list,
+            "difficulty": difficulty,
+            "language": language,
+            "question_type": question_type
+        }
+        
+        if query:
+            if vd is None:
+                raise HTTPException(status_code=503, detail="Vector database not available for semantic filtering")
+            n_results = limit or 10
+            matches = await run_in_threadpool(
+                vd.search_with_distances,
+                query,
+                n_results=n_results,
+                where=build_vector_where(tag_list, difficulty, language, question_type)
+            )
+            distances = {int(doc_id): distance for doc_id, distance in matches if str(doc_id).isdigit()}
+            hydrated = await read_db("get_questions", list(distances)) if distances else {"questions": []}
+            by_id = {question["question_id"]: question for question in hydrated["questions"]}
+            questions = [
+                {**by_id[question_id], "vector_distance": distance}
+                for question_id, distance in distances.items() if question_id in by_id
+            ]
+            return {
+                "total_results": len(questions),
+                "questions": questions,
+                "filters": filters,
+                "query": query,
+                "limit": n_results,
+                "offset": 0,
+                "next_cursor": None
+            }
         
-        questions = db.filter_questions(
+        questions = await read_db(
+            "filter_questions",
             tags=tag_list,
             difficulty=difficulty,
             language=language,
             question_type=question_type,
-            limit=limit,
-            offset=offset
+            limit=limit + 1 if limit is not None else None,
+            offset=offset,
+            cursor=after_id
         )
+        questions, next_cursor = paginate(questions, limit)
         
         return {
             "total_results": len(questions),
             "questions": questions,
-            "filters": {
-                "tags": tag_list,
-                "difficulty": difficulty,
-                "language": language,
-                "question_type": question_type
-            },
+            "filters": filters,
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error filtering questions: {e}")
         return {"error": f"Failed to filter questions: {str(e)}"}
 
+@app.get("/questions/stream")
+def stream_questions(
+    tags: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    language: Optional[str] = None,
+    question_type: Optional[str] = None,
+    batch_size: int = 1000
+):
+    """
+    Stream the whole question bank (optionally filtered) as newline-delimited JSON.
+    
+    Rows are read through a server-side cursor and written out one batch at a
+    time, so neither the backend nor the client has to hold the full bank.
+    
+    Args:
+        tags: Comma-separated list of tags to filter by
+        difficulty: Difficulty level to filter by
+        language: Language to filter by
+        question_type: Question type to filter by
+        batch_size: Number of questions fetched from the database per round trip
+    
+    Returns:
+        application/x-ndjson stream with one question object per line
+    """
+    check_services()
+    tag_list = None
+    if tags:
+        tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
+    
+    batches = db.stream_questions(
+        batch_size=max(1, batch_size),
+        tags=tag_list,
+        difficulty=difficulty,
+        language=language,
+        question_type=question_type
+    )
+    
+    def generate():
+        for batch in batches:
+            yield "".join(json.dumps(question, default=str) + "\n" for question in batch)
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 @app.get("/get-filter-options")
 def get_filter_options():
     """
@@ -375,7 +945,7 @@ def get_filter_options():
         }
 
 @app.get("/get-stats")
-def get_statistics():
+async def get_statistics():
     """
     Get comprehensive statistics about the question database.
     
@@ -383,7 +953,7 @@ def get_statistics():
         Dictionary containing various statistics about questions
     """
     try:
-        stats = db.get_stats()
+        stats = await read_db("get_stats")
         return {
             "success": True,
             "statistics": stats
@@ -469,50 +1039,90 @@ def export_all_questions(format: str):
     return export_questions(export_request)
 
 @app.post("/search-questions")
-def search_questions(query: str = Form(...), limit: int = Form(10)):
+async def search_questions(
+    query: str = Form(...),
+    limit: int = Form(10),
+    mode: str = Form("fulltext"),
+    similarity_threshold: float = Form(0.3),
+    tags: Optional[str] = Form(None),
+    difficulty: Optional[str] = Form(None),
+    language: Optional[str] = Form(None),
+    question_type: Optional[str] = Form(None)
+):
     """
-    Search questions in both SQL database and vector database.
-    Returns combined results without duplicates.
+    Hybrid search over the SQL and vector databases.
+    
+    The lexical retriever (mode 'fulltext' for ranked full-text search or
+    'fuzzy' for typo-tolerant trigram search using similarity_threshold) and
+    the vector retriever run concurrently. Their rankings are merged with
+    reciprocal rank fusion and vector-only winners are hydrated with a single
+    batched query. Each result carries its fused_score and search_source
+    ('sql', 'vector' or 'both').
+    
+    Optional tags, difficulty, language and question_type filters (comma-separated,
+    as in /filter-questions) are applied inside both retrievers rather than to
+    their results, so filtered searches still return up to limit matches.
     """
-    all_questions = set()
-    results = []
+    if mode not in ("fulltext", "fuzzy"):
+        raise HTTPException(status_code=400, detail="mode must be 'fulltext' or 'fuzzy'")
     
+    filters = {
+        "tags": parse_tags(tags),
+        "difficulty": difficulty,
+        "language": language,
+        "question_type": question_type
+    }
     
+    async def lexical_search():
+        try:
+            if mode == "fuzzy":
+                return await read_db("fuzzy_search_questions", query, limit, threshold=similarity_threshold, **filters)
+            return await read_db("search_questions", query, limit, **filters)
+        except Exception as e:
+            print(f"SQL search error: {e}")
+            return []
     
-    # Search in SQL database for text matches
-    try:
-        sql_results = db.search_questions(query, limit)
-        for question_data in sql_results:
-            question_id = question_data['question_id']
-            if question_id not in all_questions:
-                question_data['search_source'] = 'sql'
-                results.append(question_data)
-                all_questions.add(question_id)
-    except Exception as e:
-        print(f"SQL search error: {e}")
-    # Search in vector database for semantic similarity
-    if vd is not None:
+    async def vector_search():
+        if vd is None:
+            print("Vector database not available, skipping semantic search")
+            return []
         try:
-            vector_results = vd.search(query=query, n_results=limit)
-            print(f"Vector search results: {vector_results}")
-        
-            
-            # Get full question data from SQL for vector results
-            for question_id in vector_results:
-                if question_id not in all_questions:
-                    question_data = db.get_question(question_id)
-                    print(f"Vector question data: {question_data}")
-                    if question_data:
-                        question_data['search_source'] = 'vector'
-                        results.append(question_data)
-                        all_questions.add(question_id)
+            return await run_in_threadpool(vd.search_with_distances, query, n_results=limit, where=build_vector_where(**filters))
         except Exception as e:
             print(f"Vector search error: {e}")
-    else:
-        print("Vector database not available, skipping semantic search")
+            return []
+    
+    sql_results, vector_results = await asyncio.gather(lexical_search(), vector_search())
+    
+    # Vector IDs are strings; questions that are not numeric IDs cannot be hydrated
+    vector_distances = {int(doc_id): distance for doc_id, distance in vector_results if str(doc_id).isdigit()}
+    fused = reciprocal_rank_fusion({
+        "sql": [question["question_id"] for question in sql_results],
+        "vector": list(vector_distances)
+    })[:limit]
+    
+    questions = {question["question_id"]: question for question in sql_results}
+    missing_ids = [entry["id"] for entry in fused if entry["id"] not in questions]
+    if missing_ids:
+        hydrated = await read_db("get_questions", missing_ids)
+        questions.update((question["question_id"], question) for question in hydrated["questions"])
+    
+    results = []
+    for entry in fused:
+        question_data = questions.get(entry["id"])
+        if question_data is None:
+            continue  # Vector hit for a question that no longer exists
+        question_data = dict(question_data)
+        question_data["fused_score"] = entry["score"]
+        question_data["search_source"] = "both" if len(entry["sources"]) > 1 else entry["sources"][0]
+        if entry["id"] in vector_distances:
+            question_data["vector_distance"] = vector_distances[entry["id"]]
+        results.append(question_data)
     
     return {
         "query": query,
+        "mode": mode,
+        "filters": filters,
         "total_results": len(results),
-        "results": results[:limit]  # Limit final results
-    }
\ No newline at end of file
+        "results": results
+    }
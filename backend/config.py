@@ -10,3 +10,33 @@ DB_CONFIG = {
     'host': os.getenv('DB_HOST', 'localhost'),
     'port': int(os.getenv('DB_PORT', 5432))
 }
+
+# Connection pool configuration
+DB_POOL_CONFIG = {
+    'minconn': int(os.getenv('DB_POOL_MIN', 2)),
+    'maxconn': int(os.getenv('DB_POOL_MAX', 20)),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+    'health_check_interval': float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30))
+}
+
+# Embedding backend for the vector database: 'simple' (character-frequency
+# features, the original default), 'ngram' (offline hashed n-gram TF-IDF) or
+# 'ollama'. Each backend embeds into its own space, so after changing it run a
+# reindex (python reindex.py or POST /reindex) to re-embed the stored questions.
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'simple')
+
+# Quantized, memory-mapped snapshot of all embeddings used for similarity
+# scans: 'int8', 'float16' or 'off'
+EMBEDDING_SNAPSHOT_DTYPE = os.getenv('EMBEDDING_SNAPSHOT_DTYPE', 'int8')
+
+# Seconds between background Postgres/vector database reconciles (0 disables)
+RECONCILE_INTERVAL = float(os.getenv('RECONCILE_INTERVAL', 900))
+
+# Write-time near-duplicate check: each added or edited question is compared with
+# its DUPLICATE_CHECK_K nearest neighbours, and those within DUPLICATE_MAX_DISTANCE
+# (vector distance, as for /find-redundant-questions) are stored as duplicate edges
+DUPLICATE_CHECK_K = int(os.getenv('DUPLICATE_CHECK_K', 5))
+DUPLICATE_MAX_DISTANCE = float(os.getenv('DUPLICATE_MAX_DISTANCE', 0.3))
+
+# Uploaded files sent to Gemini OCR concurrently per request
+OCR_MAX_WORKERS = int(os.getenv('OCR_MAX_WORKERS', 4))
@@ -1,19 +1,279 @@
+import base64
+import json
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2 
 import psycopg2.extras
+import psycopg2.pool
 from schemas import Stats
-from config import DB_CONFIG
+from config import DB_CONFIG, DB_POOL_CONFIG
+
+# Allowed values, mirroring the CHECK constraints in database/init.sql
+DIFFICULTY_VALUES = ("Easy", "Medium", "Hard")
+QUESTION_TYPE_VALUES = ("MCQ", "Short Answer", "Long Answer", "oneword", "True/False")
+
+# Bumped by triggers on every write to questions or tags
+BANK_VERSION_SQL = "SELECT count FROM question_stats WHERE dimension = 'version' AND value = ''"
+
+# Resolves a question's interned tag_ids back to tag names, preserving tag order
+TAG_NAMES_SQL = """ARRAY(
+    SELECT d.name FROM unnest({alias}.tag_ids) WITH ORDINALITY AS u(id, ord)
+    JOIN tag_dictionary d ON d.id = u.id
+    ORDER BY u.ord
+)"""
+
+GET_QUESTION_SQL = f"""
+SELECT q.question_id, q.question, q.difficulty, q.language, q.image_required, q.type, q.solution,
+       q.created_at, q.updated_at, {TAG_NAMES_SQL.format(alias='q')} AS tags
+FROM questions q WHERE q.question_id = %s;
+"""
+
+GET_QUESTIONS_SQL = f"""
+SELECT q.question_id, q.question, q.difficulty, q.language, 
+       q.image_required, q.type, q.solution,
+       {TAG_NAMES_SQL.format(alias='q')} as tags
+FROM questions q
+WHERE q.question_id = ANY(%s)
+ORDER BY q.question_id DESC
+"""
+
+# {filters} takes extra "AND ..." conditions on questions q (see _build_filter_conditions)
+SEARCH_QUESTIONS_SQL = f"""
+WITH search AS (
+    SELECT websearch_to_tsquery('english', %(web_query)s) && to_tsquery('english', %(prefix_query)s) AS tsq
+),
+matches AS (
+    SELECT q.question_id, q.question, q.difficulty, q.language,
+           q.image_required, q.type, q.solution, q.tag_ids,
+           ts_rank_cd(q.search_vector, search.tsq) AS rank
+    FROM questions q, search
+    WHERE q.search_vector @@ search.tsq{{filters}}
+    ORDER BY rank DESC, q.question_id DESC
+    LIMIT %(limit)s
+)
+SELECT m.question_id, m.question, m.difficulty, m.language,
+       m.image_required, m.type, m.solution, m.rank,
+       {TAG_NAMES_SQL.format(alias='m')} as tags
+FROM matches m
+ORDER BY m.rank DESC, m.question_id DESC;
+"""
+
+SET_TRGM_THRESHOLDS_SQL = """
+SELECT set_config('pg_trgm.similarity_threshold', %s, true),
+       set_config('pg_trgm.word_similarity_threshold', %s, true);
+"""
+
+# {filter_join} restricts candidates to questions q matching the filters
+FUZZY_SEARCH_QUESTIONS_SQL = f"""
+WITH candidates AS (
+    SELECT q.question_id, word_similarity(%(query)s, q.question) AS score
+    FROM questions q
+    WHERE %(query)s <%% q.question
+    UNION ALL
+    SELECT t.question_id, similarity(t.tag, %(query)s) AS score
+    FROM tags t
+    WHERE t.tag %% %(query)s
+),
+best AS (
+    SELECT c.question_id, MAX(c.score) AS score
+    FROM candidates c{{filter_join}}
+    GROUP BY c.question_id
+    ORDER BY score DESC, c.question_id DESC
+    LIMIT %(limit)s
+)
+SELECT q.question_id, q.question, q.difficulty, q.language,
+       q.image_required, q.type, q.solution, b.score,
+       {TAG_NAMES_SQL.format(alias='q')} as tags
+FROM best b
+JOIN questions q ON q.question_id = b.question_id
+ORDER BY b.score DESC, q.question_id DESC;
+"""
+
+STATS_SQL = "SELECT dimension, value, count FROM question_stats WHERE count > 0;"
+
+def encode_cursor(question_id):
+    """
+    Build an opaque pagination token for the page that follows question_id.
+    """
+    payload = json.dumps({"question_id": int(question_id)}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """
+    Decode a token produced by encode_cursor. Raises ValueError if it is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded.encode()))["question_id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor}") from e
 
 class DatabaseManager:
-    def __init__(self, dbname=None, user=None, password=None, host=None, port=None):
+    def __init__(self, dbname=None, user=None, password=None, host=None, port=None,
+                 minconn=None, maxconn=None, pool_timeout=None, health_check_interval=None):
         # Use provided parameters or fall back to config
-        self.connection = psycopg2.connect(
+        self.minconn = minconn or DB_POOL_CONFIG['minconn']
+        self.maxconn = maxconn or DB_POOL_CONFIG['maxconn']
+        self.pool_timeout = pool_timeout or DB_POOL_CONFIG['timeout']
+        self.health_check_interval = (
+            health_check_interval if health_check_interval is not None
+            else DB_POOL_CONFIG['health_check_interval']
+        )
+        self.pool = psycopg2.pool.ThreadedConnectionPool(
+            self.minconn,
+            self.maxconn,
             dbname=dbname or DB_CONFIG['dbname'],
             user=user or DB_CONFIG['user'],
             password=password or DB_CONFIG['password'],
             host=host or DB_CONFIG['host'],
             port=port or DB_CONFIG['port']
         )
-        self.cursor = self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        # ThreadedConnectionPool raises instead of blocking when exhausted, so
+        # the semaphore makes callers queue for a free slot (bounded by pool_timeout).
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._stats_lock = threading.Lock()
+        self._last_used = {}
+        # Bank version change of the calling thread's last write (see last_version_change)
+        self._local = threading.local()
+        self._metrics = {
+            'checkouts': 0,
+            'in_use': 0,
+            'timeouts': 0,
+            'replaced_connections': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0
+        }
+
+    def _is_healthy(self, conn):
+        """
+        Check a pooled connection before handing it out.
+        Connections idle for less than health_check_interval are trusted without a round trip.
+        """
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            with self._stats_lock:
+                self._metrics['timeouts'] += 1
+            raise psycopg2.pool.PoolError(
+                f"Timed out after {self.pool_timeout}s waiting for a database connection"
+            )
+        try:
+            conn = self.pool.getconn()
+            if not self._is_healthy(conn):
+                self.pool.putconn(conn, close=True)
+                conn = self.pool.getconn()
+                with self._stats_lock:
+                    self._metrics['replaced_connections'] += 1
+        except Exception:
+            self._slots.release()
+            raise
+
+        wait_ms = (time.monotonic() - start) * 1000
+        with self._stats_lock:
+            self._metrics['checkouts'] += 1
+            self._metrics['in_use'] += 1
+            self._metrics['total_wait_ms'] += wait_ms
+            self._metrics['max_wait_ms'] = max(self._metrics['max_wait_ms'], wait_ms)
+        return conn
+
+    def _checkin(self, conn):
+        try:
+            self._last_used[id(conn)] = time.monotonic()
+            self.pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            with self._stats_lock:
+                self._metrics['in_use'] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def get_connection(self):
+        """
+        Check a connection out of the pool for the duration of the block.
+        The transaction is committed on success and rolled back on error.
+        """
+        conn = self._checkout()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            # BaseException so generators closed early (GeneratorExit) also roll back
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self._checkin(conn)
+
+    @contextmanager
+    def get_cursor(self):
+        """
+        Check out a pooled connection and yield a fresh DictCursor on it.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                yield cursor
+
+    @contextmanager
+    def _versioned_cursor(self):
+        """
+        Cursor for a write whose bank version change is recorded for this thread.
+        The version row is locked first, so no other write can bump it until this
+        transaction commits and (before, after) covers exactly this write.
+        """
+        self._local.version_change = None
+        with self.get_cursor() as cursor:
+            cursor.execute(BANK_VERSION_SQL + " FOR UPDATE;")
+            row = cursor.fetchone()
+            before = row[0] if row else None
+            yield cursor
+            cursor.execute(BANK_VERSION_SQL + ";")
+            row = cursor.fetchone()
+            after = row[0] if row else None
+        if before is not None and after is not None:
+            self._local.version_change = (before, after)
+
+    def last_version_change(self):
+        """
+        (version before, version after) of the last committed insert, update or
+        delete made by this thread, or None if unknown (e.g. it failed).
+        """
+        return getattr(self._local, "version_change", None)
+
+    def ping(self):
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT 1")
+            return cursor.fetchone()[0] == 1
+
+    def pool_stats(self):
+        """
+        Get connection pool sizing and wait-time metrics.
+        """
+        with self._stats_lock:
+            metrics = dict(self._metrics)
+        checkouts = metrics['checkouts']
+        metrics['avg_wait_ms'] = round(metrics['total_wait_ms'] / checkouts, 3) if checkouts else 0.0
+        metrics['total_wait_ms'] = round(metrics['total_wait_ms'], 3)
+        metrics['max_wait_ms'] = round(metrics['max_wait_ms'], 3)
+        metrics['minconn'] = self.minconn
+        metrics['maxconn'] = self.maxconn
+        return metrics
+
     def insert_question(self, question_data):
         insert_query = """
         INSERT INTO questions (question, difficulty, language, image_required, type, solution)
@@ -21,37 +281,129 @@ class DatabaseManager:
         RETURNING question_id;
         """
         try :
-            self.cursor.execute(insert_query, (
+            with self._versioned_cursor() as cursor:
+                cursor.execute(insert_query, (
+                question_data['question'],
+                question_data['difficulty'],
+                question_data.get('language', 'English'),
+                question_data.get('image_required', False),
+                question_data['question_type'],
+                question_data['solution']
+            ))
+                question_id = cursor.fetchone()[0]
+                tags = question_data.get('tags', [])
+                if tags:
+                    self._insert_tags(cursor, question_id, tags)
+        except Exception as e:
+            print(f"Error inserting question: {e}")
+            raise e
+        return question_id
+
+    def insert_questions(self, questions_data):
+        """
+        Insert many questions and their tags in a single transaction.
+        
+        Questions go in with one multi-row INSERT ... RETURNING and all tags with one
+        multi-row INSERT. If the batch is rejected, it is retried row by row under
+        savepoints so that valid questions are still stored and each failure is reported.
+        
+        Args:
+            questions_data: List of question dictionaries (same shape as insert_question)
+        
+        Returns:
+            List of per-item results in input order, each either
+            {"index", "status": "inserted", "question_id"} or {"index", "status": "failed", "error"}
+        """
+        if not questions_data:
+            return []
+        
+        rows = [self._question_row(question_data) for question_data in questions_data]
+        tag_lists = [self._unique_tags(question_data.get('tags', [])) for question_data in questions_data]
+        
+        try:
+            with self._versioned_cursor() as cursor:
+                returned = psycopg2.extras.execute_values(
+                    cursor,
+                    """
+                    INSERT INTO questions (question, difficulty, language, image_required, type, solution)
+                    VALUES %s
+                    RETURNING question_id;
+                    """,
+                    rows,
+                    page_size=len(rows),
+                    fetch=True
+                )
+                question_ids = [row[0] for row in returned]
+                tag_values = [
+                    (question_id, tag)
+                    for question_id, tags in zip(question_ids, tag_lists)
+                    for tag in tags
+                ]
+                if tag_values:
+                    psycopg2.extras.execute_values(
+                        cursor,
+                        "INSERT INTO tags (question_id, tag) VALUES %s;",
+                        tag_values,
+                        page_size=len(tag_values)
+                    )
+            return [
+                {"index": index, "status": "inserted", "question_id": question_id}
+                for index, question_id in enumerate(question_ids)
+            ]
+        except psycopg2.Error as e:
+            print(f"Bulk insert failed, retrying row by row: {e}")
+        
+        results = []
+        with self._versioned_cursor() as cursor:
+            for index, (row, tags) in enumerate(zip(rows, tag_lists)):
+                cursor.execute("SAVEPOINT bulk_item;")
+                try:
+                    cursor.execute(
+                        """
+                        INSERT INTO questions (question, difficulty, language, image_required, type, solution)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        RETURNING question_id;
+                        """,
+                        row
+                    )
+                    question_id = cursor.fetchone()[0]
+                    if tags:
+                        self._insert_tags(cursor, question_id, tags)
+                    cursor.execute("RELEASE SAVEPOINT bulk_item;")
+                    results.append({"index": index, "status": "inserted", "question_id": question_id})
+                except psycopg2.Error as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT bulk_item;")
+                    results.append({"index": index, "status": "failed", "error": str(e).strip()})
+        return results
+
+    def _question_row(self, question_data):
+        return (
             question_data['question'],
             question_data['difficulty'],
             question_data.get('language', 'English'),
             question_data.get('image_required', False),
             question_data['question_type'],
             question_data['solution']
-        ))
-            question_id = self.cursor.fetchone()[0]
-            self.connection.commit()
-            tags = question_data.get('tags', [])
-            if tags:
-                self.insert_tags(question_id, tags)
-        except Exception as e:
-            print(f"Error inserting question: {e}")
-            self.connection.rollback()
-            raise e
-        return question_id
+        )
+
+    def _unique_tags(self, tags):
+        # tags has a UNIQUE(question_id, tag) constraint, so drop repeats up front
+        return list(dict.fromkeys(tag for tag in (tags or []) if tag))
 
     def get_question(self, question_id):
-        question_query = "SELECT * FROM questions WHERE question_id = %s;"
-        self.cursor.execute(question_query, (question_id,))
-        question = self.cursor.fetchone()
+        with self.get_cursor() as cursor:
+            cursor.execute(GET_QUESTION_SQL, (question_id,))
+            question = cursor.fetchone()
         if not question:
             return None
-        tags_query = "SELECT tag FROM tags WHERE question_id = %s;"
-        self.cursor.execute(tags_query, (question_id,))
-        tags = [row['tag'] for row in self.cursor.fetchall()]
-        question_dict = dict(question)
-        question_dict['tags'] = tags
+        return self._question_from_row(question)
+
+    @staticmethod
+    def _question_from_row(row):
+        question_dict = dict(row)
+        question_dict['tags'] = list(question_dict.get('tags') or [])
         return question_dict
+
     def get_questions(self, question_ids):
         """
         Get multiple questions by their IDs.
@@ -66,295 +418,430 @@ class DatabaseManager:
             return {"questions": []}
         
         try:
-            # Use a single query with IN clause for better performance
-            placeholders = ','.join(['%s'] * len(question_ids))
-            query = f"""
-            SELECT q.question_id, q.question, q.difficulty, q.language, 
-                   q.image_required, q.type, q.solution,
-                   STRING_AGG(DISTINCT t.tag, ',') as tags
-            FROM questions q
-            LEFT JOIN tags t ON q.question_id = t.question_id
-            WHERE q.question_id IN ({placeholders})
-            GROUP BY q.question_id, q.question, q.difficulty, q.language, q.image_required, q.type, q.solution
-            ORDER BY q.question_id DESC
-            """
+            with self.get_cursor() as cursor:
+                cursor.execute(GET_QUESTIONS_SQL, (list(question_ids),))
+                rows = cursor.fetchall()
             
-            self.cursor.execute(query, question_ids)
-            
-            questions_data = []
-            for row in self.cursor.fetchall():
-                question_dict = dict(row)
-                # Handle tags - convert comma-separated string to list
-                tags_string = question_dict.get('tags', '')
-                if tags_string and tags_string.strip():
-                    question_dict['tags'] = [tag.strip() for tag in tags_string.split(',') if tag.strip()]
-                else:
-                    question_dict['tags'] = []
-                questions_data.append(question_dict)
+            questions_data = [self._question_from_row(row) for row in rows]
             
             return {"questions": questions_data}
             
         except psycopg2.Error as e:
             print(f"Error fetching questions: {e}")
-            self.connection.rollback()
             return {"questions": []}
 
     def update_question(self, question_id, update_data):
+        # Work on a copy: callers use the fields they passed to decide what else to refresh
+        update_data = dict(update_data)
         tags = update_data.pop('tags', None)
         
-        if update_data:
-            # Map frontend field names to database field names
-            field_mapping = {
-                'question_type': 'type'
-            }
-            
-            # Build the SET clause with proper field mapping
-            set_parts = []
-            values = []
+        with self._versioned_cursor() as cursor:
+            if update_data:
+                # Map frontend field names to database field names
+                field_mapping = {
+                    'question_type': 'type'
+                }
+                
+                # Build the SET clause with proper field mapping
+                set_parts = []
+                values = []
+                
+                for key, value in update_data.items():
+                    # Map the field name if needed
+                    db_field = field_mapping.get(key, key)
+                    set_parts.append(f"{db_field} = %s")
+                    values.append(value)
+                
+                set_clause = ', '.join(set_parts)
+                values.append(question_id)  # Add question_id for WHERE clause
+                
+                query = f"UPDATE questions SET {set_clause} WHERE question_id = %s;"
+                cursor.execute(query, values)
             
-            for key, value in update_data.items():
-                # Map the field name if needed
-                db_field = field_mapping.get(key, key)
-                set_parts.append(f"{db_field} = %s")
-                values.append(value)
-            
-            set_clause = ', '.join(set_parts)
-            values.append(question_id)  # Add question_id for WHERE clause
-            
-            query = f"UPDATE questions SET {set_clause} WHERE question_id = %s;"
-            self.cursor.execute(query, values)
-            self.connection.commit()
-        
-        if tags is not None:
-            self.cursor.execute("DELETE FROM tags WHERE question_id = %s;", (question_id,))
-            self.connection.commit()
-            if tags:
-                self.insert_tags(question_id, tags)
+            if tags is not None:
+                cursor.execute("DELETE FROM tags WHERE question_id = %s;", (question_id,))
+                if tags:
+                    self._insert_tags(cursor, question_id, tags)
 
     def delete_question(self, question_id):
-        self.cursor.execute(f"DELETE FROM tags WHERE question_id ={question_id} ")
-        self.connection.commit()
-        self.cursor.execute("DELETE FROM questions WHERE question_id = %s;", (question_id,))
-        self.connection.commit()
+        with self._versioned_cursor() as cursor:
+            cursor.execute("DELETE FROM tags WHERE question_id = %s;", (question_id,))
+            cursor.execute("DELETE FROM questions WHERE question_id = %s;", (question_id,))
         
 
     def insert_tag(self, question_id, tag):
         query = "INSERT INTO tags (question_id, tag) VALUES (%s, %s);"
-        self.cursor.execute(query, (question_id, tag))
-        self.connection.commit()
+        with self.get_cursor() as cursor:
+            cursor.execute(query, (question_id, tag))
 
     def get_tags(self, question_id):
         query = "SELECT * FROM tags WHERE question_id = %s;"
-        self.cursor.execute(query, (question_id,))
-        return self.cursor.fetchall()
+        with self.get_cursor() as cursor:
+            cursor.execute(query, (question_id,))
+            return cursor.fetchall()
 
     def update_tag(self, tag_id, new_tag):
         query = "UPDATE tags SET tag = %s WHERE id = %s;"
-        self.cursor.execute(query, (new_tag, tag_id))
-        self.connection.commit()
+        with self.get_cursor() as cursor:
+            cursor.execute(query, (new_tag, tag_id))
 
     def delete_tag(self, tag_id):
         query = "DELETE FROM tags WHERE id = %s;"
-        self.cursor.execute(query, (tag_id,))
-        self.connection.commit()
+        with self.get_cursor() as cursor:
+            cursor.execute(query, (tag_id,))
     def insert_tags(self, question_id, tags):
         if not tags:
             return
+        with self.get_cursor() as cursor:
+            self._insert_tags(cursor, question_id, tags)
+
+    def _insert_tags(self, cursor, question_id, tags):
         query = """ INSERT INTO tags (question_id, tag) VALUES %s; """
         # Prepare a list of tuples for execution
         values = [(question_id, tag) for tag in tags]
-        psycopg2.extras.execute_values(self.cursor, query, values)
-        self.connection.commit()
+        psycopg2.extras.execute_values(cursor, query, values)
+
+    @staticmethod
+    def _build_prefix_tsquery(search_query):
+        """
+        Split a search string into the websearch part and explicit prefix terms.
+        Words ending in '*' (e.g. "peri*") become prefix matches ("peri:*").
+        """
+        prefix_terms = re.findall(r"(\w+)\*", search_query)
+        web_query = re.sub(r"\w+\*", " ", search_query).strip()
+        prefix_query = " & ".join(f"{term}:*" for term in prefix_terms)
+        return web_query, prefix_query
+
+    @staticmethod
+    def _build_search_query(search_query, limit=10, tags=None, difficulty=None, language=None, question_type=None):
+        """
+        Build the SQL and parameters for search_questions, or (None, None) if the
+        query has no searchable terms.
+        """
+        web_query, prefix_query = DatabaseManager._build_prefix_tsquery(search_query)
+        if not re.search(r"\w", web_query) and not prefix_query:
+            return None, None
+        conditions, params = DatabaseManager._build_filter_conditions(
+            tags=tags, difficulty=difficulty, language=language, question_type=question_type
+        )
+        query = SEARCH_QUESTIONS_SQL.format(filters="".join(f" AND {condition}" for condition in conditions))
+        params.update(web_query=web_query, prefix_query=prefix_query, limit=limit)
+        return query, params
 
-    def search_questions(self, search_query, limit=10):
+    @staticmethod
+    def _build_fuzzy_search_query(search_query, limit=10, tags=None, difficulty=None, language=None, question_type=None):
+        """
+        Build the SQL and parameters for fuzzy_search_questions.
         """
-        Search questions in the database using text matching.
-        Searches in question text, solution, and tags.
+        conditions, params = DatabaseManager._build_filter_conditions(
+            tags=tags, difficulty=difficulty, language=language, question_type=question_type
+        )
+        filter_join = ""
+        if conditions:
+            filter_join = "\n    JOIN questions q ON q.question_id = c.question_id WHERE " + " AND ".join(conditions)
+        params.update(query=search_query.strip(), limit=limit)
+        return FUZZY_SEARCH_QUESTIONS_SQL.format(filter_join=filter_join), params
+
+    def search_questions(self, search_query, limit=10, tags=None, difficulty=None, language=None, question_type=None):
         """
-        search_pattern = f"%{search_query}%"
+        Full-text search over question text, tags, solution, difficulty and type.
         
-        query = """
-        SELECT q.question_id, q.question, q.difficulty, q.language, 
-               q.image_required, q.type, q.solution,
-               STRING_AGG(DISTINCT t.tag, ',') as tags,
-               CASE 
-                   WHEN q.question ILIKE %s THEN 1
-                   WHEN q.solution ILIKE %s THEN 2
-                   WHEN EXISTS (SELECT 1 FROM tags t2 WHERE t2.question_id = q.question_id AND t2.tag ILIKE %s) THEN 3
-                   ELSE 4
-               END as match_priority
-        FROM questions q
-        LEFT JOIN tags t ON q.question_id = t.question_id
-        WHERE 
-            q.question ILIKE %s OR 
-            q.solution ILIKE %s OR 
-            q.difficulty ILIKE %s OR 
-            q.type ILIKE %s OR
-            EXISTS (SELECT 1 FROM tags t3 WHERE t3.question_id = q.question_id AND t3.tag ILIKE %s)
-        GROUP BY q.question_id, q.question, q.difficulty, q.language, q.image_required, q.type, q.solution
-        ORDER BY match_priority
-        LIMIT %s;
+        Uses the trigger-maintained questions.search_vector column (GIN indexed) and
+        ranks matches with ts_rank_cd. The query accepts websearch syntax: "quoted
+        phrases", OR, and -excluded words, plus prefix terms written as word*.
+        Optional filters are applied inside the query, as in filter_questions.
+        
+        Returns:
+            List of question dictionaries with tags and a relevance rank
         """
+        query, params = self._build_search_query(
+            search_query, limit, tags=tags, difficulty=difficulty, language=language, question_type=question_type
+        )
+        if query is None:
+            return []
         
         try:
-            self.cursor.execute(query, (
-            search_pattern, search_pattern, search_pattern,
-            search_pattern, search_pattern, search_pattern, search_pattern, search_pattern, limit
-        ))
+            with self.get_cursor() as cursor:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
         except psycopg2.Error as e:
             print(f"Error executing search query: {e}")
-            self.connection.rollback()
             return []
 
         results = []
-        for row in self.cursor.fetchall():
-            question_dict = dict(row)
-            # Handle tags - convert comma-separated string to list
-            tags_string = question_dict.get('tags', '')
-            if tags_string and tags_string.strip():
-                question_dict['tags'] = [tag.strip() for tag in tags_string.split(',') if tag.strip()]
-            else:
-                question_dict['tags'] = []
+        for row in rows:
+            question_dict = self._question_from_row(row)
+            question_dict['rank'] = float(question_dict['rank'])
             results.append(question_dict)
         
         return results
 
-    def get_all_questions(self, limit=None, offset=0):
+    def fuzzy_search_questions(self, search_query, limit=10, threshold=0.3, tags=None, difficulty=None, language=None,
+                               question_type=None):
+        """
+        Typo-tolerant search using pg_trgm trigram similarity.
+        
+        Question text is matched with word similarity (<%, so a misspelled word can
+        match inside a long question) and tags with plain similarity (%). Both
+        operators are served by the trigram GIN indexes.
+        
+        Args:
+            search_query: Text to look for, possibly misspelled
+            limit: Maximum number of questions to return
+            threshold: Minimum similarity (0-1) for a match
+            tags, difficulty, language, question_type: Same filters as filter_questions
+        
+        Returns:
+            List of question dictionaries with tags and a similarity score
+        """
+        if not search_query or not search_query.strip():
+            return []
+        
+        query, params = self._build_fuzzy_search_query(
+            search_query, limit, tags=tags, difficulty=difficulty, language=language, question_type=question_type
+        )
+        try:
+            with self.get_cursor() as cursor:
+                # Thresholds are transaction-local so pooled connections are left untouched
+                cursor.execute(SET_TRGM_THRESHOLDS_SQL, (str(threshold), str(threshold)))
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+        except psycopg2.Error as e:
+            print(f"Error executing fuzzy search query: {e}")
+            return []
+
+        results = []
+        for row in rows:
+            question_dict = self._question_from_row(row)
+            question_dict['score'] = float(question_dict['score'])
+            results.append(question_dict)
+        
+        return results
+
+    def get_all_questions(self, limit=None, offset=0, cursor=None):
         """
         Get all questions from the database with their tags.
         
         Args:
             limit: Maximum number of questions to return (None for all)
             offset: Number of questions to skip (for pagination)
+            cursor: Only return questions with a lower question_id (keyset pagination)
         
         Returns:
             List of question dictionaries with tags
         """
-        try:
-            # Build the query with optional limit and offset
-            query = """
-            SELECT q.question_id, q.question, q.difficulty, q.language, 
-                   q.image_required, q.type, q.solution,
-                   STRING_AGG(DISTINCT t.tag, ',') as tags
-            FROM questions q
-            LEFT JOIN tags t ON q.question_id = t.question_id
-            GROUP BY q.question_id, q.question, q.difficulty, q.language, q.image_required, q.type, q.solution
-            ORDER BY q.question_id DESC
-            """
-            
-            params = []
-            if limit is not None:
-                query += " LIMIT %s"
-                params.append(limit)
-            if offset > 0:
-                query += " OFFSET %s"
-                params.append(offset)
-            
-            self.cursor.execute(query, tuple(params))
-            
-            results = []
-            for row in self.cursor.fetchall():
-                question_dict = dict(row)
-                # Handle tags - convert comma-separated string to list
-                tags_string = question_dict.get('tags', '')
-                if tags_string and tags_string.strip():
-                    question_dict['tags'] = [tag.strip() for tag in tags_string.split(',') if tag.strip()]
-                else:
-                    question_dict['tags'] = []
-                results.append(question_dict)
-            
-            return results
-            
-        except psycopg2.Error as e:
-            print(f"Error fetching all questions: {e}")
-            self.connection.rollback()
+        return self.filter_questions(limit=limit, offset=offset, cursor=cursor)
+
+    @staticmethod
+    def _normalize_filter_values(values, allowed=None):
+        """
+        Turn a filter value (a single value, a comma-separated string or a list) into
+        a list of values. When allowed is given, values are mapped case-insensitively
+        onto their canonical spelling (e.g. 'easy' -> 'Easy').
+        """
+        if not values:
             return []
+        if isinstance(values, str):
+            values = values.split(',')
+        values = [value.strip() for value in values if value and value.strip()]
+        if allowed:
+            canonical = {value.lower(): value for value in allowed}
+            values = [canonical.get(value.lower(), value) for value in values]
+        return list(dict.fromkeys(values))
+
+    @staticmethod
+    def _build_filter_conditions(tags=None, difficulty=None, language=None, question_type=None):
+        """
+        Build WHERE conditions on questions q for the shared filters.
+        
+        Returns:
+            Tuple of (list of conditions, dict of named parameters)
+        """
+        # difficulty/type/language are matched exactly (case-normalized) so the
+        # composite B-tree indexes can be used.
+        conditions = []
+        params = {}
+        
+        difficulties = DatabaseManager._normalize_filter_values(difficulty, DIFFICULTY_VALUES)
+        if difficulties:
+            conditions.append("q.difficulty = ANY(%(difficulties)s)")
+            params["difficulties"] = difficulties
+        
+        languages = DatabaseManager._normalize_filter_values(language)
+        if languages:
+            conditions.append("lower(q.language) = ANY(%(languages)s)")
+            params["languages"] = [value.lower() for value in languages]
+        
+        question_types = DatabaseManager._normalize_filter_values(question_type, QUESTION_TYPE_VALUES)
+        if question_types:
+            conditions.append("q.type = ANY(%(question_types)s)")
+            params["question_types"] = question_types
+        
+        if tags and len(tags) > 0:
+            conditions.append("q.tag_ids && ARRAY(SELECT id FROM tag_dictionary WHERE name = ANY(%(tags)s))")
+            params["tags"] = list(tags)
+        
+        return conditions, params
+
+    @staticmethod
+    def _build_filter_query(tags=None, difficulty=None, language=None, question_type=None, limit=None, offset=0, cursor=None,
+                            updated_since=None):
+        """
+        Build the SQL and parameters shared by filter_questions and stream_questions.
+        """
+        where_conditions, params = DatabaseManager._build_filter_conditions(
+            tags=tags, difficulty=difficulty, language=language, question_type=question_type
+        )
+        
+        if cursor is not None:
+            where_conditions.append("q.question_id < %(cursor)s")
+            params["cursor"] = cursor
+        
+        if updated_since is not None:
+            where_conditions.append("q.updated_at > %(updated_since)s")
+            params["updated_since"] = updated_since
+        
+        # Base query
+        query = f"""
+        SELECT q.question_id, q.question, q.difficulty, q.language, 
+               q.image_required, q.type, q.solution,
+               {TAG_NAMES_SQL.format(alias='q')} as tags
+        FROM questions q
+        """
+        
+        # Add WHERE clause if we have conditions
+        if where_conditions:
+            query += " WHERE " + " AND ".join(where_conditions)
+        
+        query += " ORDER BY q.question_id DESC"
+        
+        # Add LIMIT and OFFSET
+        if limit is not None:
+            query += " LIMIT %(limit)s"
+            params["limit"] = limit
+        if offset > 0:
+            query += " OFFSET %(offset)s"
+            params["offset"] = offset
+        
+        return query, params
 
-    def filter_questions(self, tags=None, difficulty=None, language=None, question_type=None, limit=None, offset=0):
+    def filter_questions(self, tags=None, difficulty=None, language=None, question_type=None, limit=None, offset=0, cursor=None):
         """
         Filter questions based on various criteria.
         
+        Tags are matched against the interned questions.tag_ids array (GIN indexed)
+        and resolved back to names only for the rows returned. Passing cursor instead
+        of offset makes deep pages an index range scan on the primary key.
+        
         Args:
             tags: List of tags to filter by (questions with ANY of these tags)
-            difficulty: Difficulty level to filter by
-            language: Language to filter by
-            question_type: Question type to filter by
+            difficulty: Difficulty level(s) to filter by (value, list or comma-separated)
+            language: Language(s) to filter by (value, list or comma-separated)
+            question_type: Question type(s) to filter by (value, list or comma-separated)
             limit: Maximum number of questions to return
             offset: Number of questions to skip (for pagination)
+            cursor: Only return questions with a lower question_id (keyset pagination)
         
         Returns:
             List of filtered question dictionaries with tags
         """
         try:
-            # Build the WHERE clause dynamically
-            where_conditions = []
-            params = []
-            
-            if difficulty:
-                where_conditions.append("q.difficulty ILIKE %s")
-                params.append(f"%{difficulty}%")
-            
-            if language:
-                where_conditions.append("q.language ILIKE %s")
-                params.append(f"%{language}%")
-            
-            if question_type:
-                where_conditions.append("q.type ILIKE %s")
-                params.append(f"%{question_type}%")
-            
-            if tags and len(tags) > 0:
-                # Create placeholders for tags
-                tag_placeholders = ','.join(['%s'] * len(tags))
-                where_conditions.append(f"EXISTS (SELECT 1 FROM tags t2 WHERE t2.question_id = q.question_id AND t2.tag IN ({tag_placeholders}))")
-                params.extend(tags)
-            
-            # Base query
-            query = """
-            SELECT q.question_id, q.question, q.difficulty, q.language, 
-                   q.image_required, q.type, q.solution,
-                   STRING_AGG(DISTINCT t.tag, ',') as tags
-            FROM questions q
-            LEFT JOIN tags t ON q.question_id = t.question_id
-            """
-            
-            # Add WHERE clause if we have conditions
-            if where_conditions:
-                query += " WHERE " + " AND ".join(where_conditions)
-            
-            # Add GROUP BY and ORDER BY
-            query += """
-            GROUP BY q.question_id, q.question, q.difficulty, q.language, q.image_required, q.type, q.solution
-            ORDER BY q.question_id DESC
-            """
-            
-            # Add LIMIT and OFFSET
-            if limit is not None:
-                query += " LIMIT %s"
-                params.append(limit)
-            if offset > 0:
-                query += " OFFSET %s"
-                params.append(offset)
+            query, params = self._build_filter_query(
+                tags=tags,
+                difficulty=difficulty,
+                language=language,
+                question_type=question_type,
+                limit=limit,
+                offset=offset,
+                cursor=cursor
+            )
             
-            self.cursor.execute(query, tuple(params))
+            with self.get_cursor() as db_cursor:
+                db_cursor.execute(query, params)
+                rows = db_cursor.fetchall()
             
-            results = []
-            for row in self.cursor.fetchall():
-                question_dict = dict(row)
-                # Handle tags - convert comma-separated string to list
-                tags_string = question_dict.get('tags', '')
-                if tags_string and tags_string.strip():
-                    question_dict['tags'] = [tag.strip() for tag in tags_string.split(',') if tag.strip()]
-                else:
-                    question_dict['tags'] = []
-                results.append(question_dict)
-            
-            return results
+            return [self._question_from_row(row) for row in rows]
             
         except psycopg2.Error as e:
             print(f"Error filtering questions: {e}")
-            self.connection.rollback()
             return []
 
+    def explain_filter_questions(self, analyze=False, disable_seqscan=False, **filters):
+        """
+        Run EXPLAIN on the query filter_questions would issue.
+        
+        Args:
+            analyze: Use EXPLAIN (ANALYZE, BUFFERS), which executes the query, for timings
+            disable_seqscan: Plan with enable_seqscan off, so small tables (where a
+                sequential scan is cheapest) still show which index would be chosen
+            **filters: Same keyword arguments as filter_questions
+        
+        Returns:
+            List of plan lines, e.g. to confirm the composite indexes are used
+        """
+        query, params = self._build_filter_query(**filters)
+        explain = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+        with self.get_cursor() as db_cursor:
+            if disable_seqscan:
+                db_cursor.execute("SET LOCAL enable_seqscan = off;")
+            db_cursor.execute(explain + query, params)
+            return [row[0] for row in db_cursor.fetchall()]
+
+    def stream_questions(self, batch_size=1000, tags=None, difficulty=None, language=None, question_type=None, cursor=None,
+                         updated_since=None):
+        """
+        Iterate over matching questions in batches using a server-side (named) cursor.
+        
+        Rows are pulled from Postgres batch_size at a time, so memory stays flat no
+        matter how large the bank is. A pooled connection is held until the
+        generator is exhausted or closed.
+        
+        Args:
+            batch_size: Number of rows fetched per round trip
+            tags, difficulty, language, question_type: Same filters as filter_questions
+            cursor: Only stream questions with a lower question_id (resume point)
+            updated_since: Only stream questions modified after this timestamp
+        
+        Yields:
+            Lists of question dictionaries with tags
+        """
+        query, params = self._build_filter_query(
+            tags=tags,
+            difficulty=difficulty,
+            language=language,
+            question_type=question_type,
+            cursor=cursor,
+            updated_since=updated_since
+        )
+        with self.get_connection() as conn:
+            with conn.cursor(name="question_stream", cursor_factory=psycopg2.extras.DictCursor) as db_cursor:
+                db_cursor.itersize = batch_size
+                db_cursor.execute(query, params)
+                while True:
+                    rows = db_cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield [self._question_from_row(row) for row in rows]
+
+    def get_question_ids(self):
+        """
+        Get the IDs of every question.
+        
+        Returns:
+            List of question IDs
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT question_id FROM questions;")
+            return [row[0] for row in cursor.fetchall()]
+
+    def get_database_time(self):
+        """
+        Get the database's current local timestamp, comparable with updated_at.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT LOCALTIMESTAMP;")
+            return cursor.fetchone()[0]
+
     def get_unique_values(self, field):
         """
         Get unique values for a specific field (difficulty, language, type).
@@ -370,9 +857,9 @@ class DatabaseManager:
                 raise ValueError("Field must be one of: difficulty, language, type")
             
             query = f"SELECT DISTINCT {field} FROM questions WHERE {field} IS NOT NULL AND {field} != '' ORDER BY {field};"
-            self.cursor.execute(query)
-            
-            results = [row[0] for row in self.cursor.fetchall()]
+            with self.get_cursor() as cursor:
+                cursor.execute(query)
+                results = [row[0] for row in cursor.fetchall()]
             return results
             
         except (psycopg2.Error, ValueError) as e:
@@ -382,74 +869,67 @@ class DatabaseManager:
         """
         Get comprehensive statistics about the question database.
         
+        All counts come from the trigger-maintained question_stats table in a
+        single query, so the cost does not grow with the size of the bank.
+        
         Returns:
             Dictionary containing counts by difficulty, question type, and all topics
         """
         try:
-            stats = {}
-            
-            # Get difficulty statistics
-            difficulties = ["Easy", "Medium", "Hard"]
-            for difficulty in difficulties:
-                query = "SELECT COUNT(*) FROM questions WHERE difficulty ILIKE %s"
-                self.cursor.execute(query, (difficulty,))
-                count = self.cursor.fetchone()[0]
-                stats[difficulty] = count
-            
-            # Get question type statistics
-            type_mapping = {
-                "MCQ": "MCQ",
-                "Short Answer": "Short_answer", 
-                "Long Answer": "Long_answer",
-                "oneword": "oneword",
-                "True/False": "Tf"
-            }
-            
-            for db_type, schema_key in type_mapping.items():
-                query = "SELECT COUNT(*) FROM questions WHERE type ILIKE %s"
-                self.cursor.execute(query, (db_type,))
-                count = self.cursor.fetchone()[0]
-                stats[schema_key] = count
-            
-            # Get all unique topics/tags
-            query = "SELECT DISTINCT tag FROM tags WHERE tag IS NOT NULL AND tag != '' ORDER BY tag"
-            self.cursor.execute(query)
-            topics = [row[0] for row in self.cursor.fetchall()]
-            stats['topics'] = topics
-            
-            # Get total questions count
-            query = "SELECT COUNT(*) FROM questions"
-            self.cursor.execute(query)
-            stats['total_questions'] = self.cursor.fetchone()[0]
-            
-            # Get language statistics
-            query = "SELECT language, COUNT(*) FROM questions WHERE language IS NOT NULL GROUP BY language ORDER BY COUNT(*) DESC"
-            self.cursor.execute(query)
-            language_stats = {}
-            for row in self.cursor.fetchall():
-                language_stats[row[0]] = row[1]
-            stats['languages'] = language_stats
-            
-            # Get tag statistics (most popular tags)
-            query = """
-            SELECT tag, COUNT(*) as count 
-            FROM tags 
-            WHERE tag IS NOT NULL AND tag != '' 
-            GROUP BY tag 
-            ORDER BY count DESC 
-            LIMIT 10
-            """
-            self.cursor.execute(query)
-            tag_stats = {}
-            for row in self.cursor.fetchall():
-                tag_stats[row[0]] = row[1]
-            stats['popular_tags'] = tag_stats
-            
-            return stats
+            with self.get_cursor() as cursor:
+                cursor.execute(STATS_SQL)
+                rows = cursor.fetchall()
+            return self._stats_from_rows(rows)
             
         except psycopg2.Error as e:
             print(f"Error getting statistics: {e}")
             return {}
+    @staticmethod
+    def _stats_from_rows(rows):
+        """
+        Assemble the /get-stats payload from (dimension, value, count) counter rows.
+        """
+        counters = {}
+        for dimension, value, count in rows:
+            counters.setdefault(dimension, {})[value] = count
+        
+        stats = {}
+        
+        # Get difficulty statistics
+        difficulties = ["Easy", "Medium", "Hard"]
+        difficulty_counts = counters.get('difficulty', {})
+        for difficulty in difficulties:
+            stats[difficulty] = difficulty_counts.get(difficulty, 0)
+        
+        # Get question type statistics
+        type_mapping = {
+            "MCQ": "MCQ",
+            "Short Answer": "Short_answer", 
+            "Long Answer": "Long_answer",
+            "oneword": "oneword",
+            "True/False": "Tf"
+        }
+        
+        type_counts = counters.get('type', {})
+        for db_type, schema_key in type_mapping.items():
+            stats[schema_key] = type_counts.get(db_type, 0)
+        
+        # Get all unique topics/tags
+        tag_counts = {tag: count for tag, count in counters.get('tag', {}).items() if tag}
+        stats['topics'] = sorted(tag_counts)
+        
+        # Get total questions count
+        stats['total_questions'] = counters.get('total', {}).get('', 0)
+        
+        # Get language statistics
+        language_counts = counters.get('language', {})
+        stats['languages'] = dict(sorted(language_counts.items(), key=lambda item: item[1], reverse=True))
+        
+        # Get tag statistics (most popular tags)
+        stats['popular_tags'] = dict(sorted(tag_counts.items(), key=lambda item: item[1], reverse=True)[:10])
+        
+        return stats
+
     def get_all_tags(self):
         """
         Get all unique tags from the database.
@@ -459,21 +939,174 @@ class DatabaseManager:
         """
         try:
             query = "SELECT DISTINCT tag FROM tags WHERE tag IS NOT NULL AND tag != '' ORDER BY tag;"
-            self.cursor.execute(query)
-            
-            results = [row[0] for row in self.cursor.fetchall()]
+            with self.get_cursor() as cursor:
+                cursor.execute(query)
+                results = [row[0] for row in cursor.fetchall()]
             return results
             
         except psycopg2.Error as e:
             print(f"Error getting all tags: {e}")
             return []
 
+    def get_bank_version(self):
+        """
+        Get the question bank version, bumped by triggers on every write to questions or tags.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute(BANK_VERSION_SQL + ";")
+            row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def get_redundancy_report(self, threshold, n, bank_version, method="vector", embedding_model=""):
+        """
+        Get a stored redundancy report computed for these settings at this bank version
+        (and, for vector reports, with this embedding model).
+        
+        Returns:
+            The report dictionary, or None if there is no report for this version
+        """
+        query = """
+        SELECT report FROM redundancy_reports
+        WHERE method = %s AND embedding_model = %s AND threshold = %s AND n = %s AND bank_version = %s;
+        """
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute(query, (method, embedding_model, threshold, n, bank_version))
+                row = cursor.fetchone()
+            return row[0] if row else None
+        except psycopg2.Error as e:
+            print(f"Error getting redundancy report: {e}")
+            return None
+
+    def save_redundancy_report(self, threshold, n, bank_version, report, method="vector", embedding_model=""):
+        """
+        Store a redundancy report and drop older reports for the same settings.
+        """
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO redundancy_reports (method, embedding_model, threshold, n, bank_version, report)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (method, embedding_model, threshold, n, bank_version) DO UPDATE SET report = EXCLUDED.report;
+                    """,
+                    (method, embedding_model, threshold, n, bank_version, psycopg2.extras.Json(report))
+                )
+                cursor.execute(
+                    """
+                    DELETE FROM redundancy_reports
+                    WHERE method = %s AND threshold = %s AND n = %s
+                      AND (bank_version < %s OR embedding_model <> %s);
+                    """,
+                    (method, threshold, n, bank_version, embedding_model)
+                )
+        except psycopg2.Error as e:
+            print(f"Error saving redundancy report: {e}")
+
+    def delete_redundancy_reports(self, method="vector"):
+        """
+        Drop every stored report of a method, e.g. after vectors were rewritten
+        without a bank version change (reindex, reconcile).
+        """
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("DELETE FROM redundancy_reports WHERE method = %s;", (method,))
+        except psycopg2.Error as e:
+            print(f"Error deleting redundancy reports: {e}")
+
+    def replace_duplicate_edges(self, neighbours, replace=True):
+        """
+        Replace the duplicate graph edges of the given questions.
+        
+        Args:
+            neighbours: {question_id: [(duplicate_id, distance), ...]}
+            replace: Remove every existing edge touching these questions before the
+                new ones are stored (False only adds or refreshes edges, as in a backfill)
+        """
+        question_ids = [int(question_id) for question_id in neighbours]
+        if not question_ids:
+            return
+        edges = {}
+        for question_id, matches in neighbours.items():
+            for duplicate_id, distance in matches:
+                pair = tuple(sorted((int(question_id), int(duplicate_id))))
+                if pair[0] != pair[1]:
+                    edges[pair] = min(distance, edges.get(pair, distance))
+        try:
+            with self.get_cursor() as cursor:
+                if replace:
+                    cursor.execute(
+                        "DELETE FROM question_duplicates WHERE question_id = ANY(%s) OR duplicate_id = ANY(%s);",
+                        (question_ids, question_ids)
+                    )
+                if edges:
+                    # Neighbours deleted since the vector query are skipped by the join
+                    psycopg2.extras.execute_values(
+                        cursor,
+                        """
+                        INSERT INTO question_duplicates (question_id, duplicate_id, distance)
+                        SELECT v.question_id, v.duplicate_id, v.distance
+                        FROM (VALUES %s) AS v (question_id, duplicate_id, distance)
+                        JOIN questions a ON a.question_id = v.question_id
+                        JOIN questions b ON b.question_id = v.duplicate_id
+                        ON CONFLICT (question_id, duplicate_id) DO UPDATE SET
+                            distance = EXCLUDED.distance,
+                            detected_at = CURRENT_TIMESTAMP;
+                        """,
+                        [(id_a, id_b, float(distance)) for (id_a, id_b), distance in edges.items()],
+                        template="(%s::int, %s::int, %s::float8)"
+                    )
+        except psycopg2.Error as e:
+            print(f"Error saving duplicate edges: {e}")
+
+    def clear_duplicate_edges(self):
+        """
+        Remove every edge of the duplicate graph (before a full backfill).
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("TRUNCATE question_duplicates;")
+
+    def get_duplicate_edges(self, max_distance=None):
+        """
+        Get the stored duplicate graph.
+        
+        Args:
+            max_distance: Only return edges at most this far apart
+        
+        Returns:
+            List of (question_id, duplicate_id, distance) tuples sorted by distance
+        """
+        query = "SELECT question_id, duplicate_id, distance FROM question_duplicates"
+        params = ()
+        if max_distance is not None:
+            query += " WHERE distance <= %s"
+            params = (max_distance,)
+        query += " ORDER BY distance, question_id, duplicate_id;"
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute(query, params)
+                return [tuple(row) for row in cursor.fetchall()]
+        except psycopg2.Error as e:
+            print(f"Error getting duplicate edges: {e}")
+            return []
+
     def close(self):
-        self.cursor.close()
-        self.connection.close()
+        self.pool.closeall()
 if __name__ == "__main__":
-    db_manager = DatabaseManager()
+    try:
+        db_manager = DatabaseManager()
+    except psycopg2.OperationalError as e:
+        print(f"Skipping database checks, no database available: {e}")
+        sys.exit(0)
     print(db_manager.get_questions([19 , 18 , 17]))
+
+    # Check that exact filters are served by the composite (difficulty, type, question_id DESC) index
+    plan = db_manager.explain_filter_questions(disable_seqscan=True, difficulty='Easy', question_type='MCQ', limit=20)
+    print("\n".join(plan))
+    if not any("idx_questions_difficulty_type_id" in line for line in plan):
+        db_manager.close()
+        sys.exit("FAIL: filter_questions does not use idx_questions_difficulty_type_id")
+    print("OK: filter_questions uses idx_questions_difficulty_type_id")
     # Example usage
     # question_data = {
     #     'question': 'What is the capital of France?',
@@ -0,0 +1,115 @@
+import argparse
+import threading
+import time
+from datetime import datetime
+
+from config import DUPLICATE_CHECK_K, DUPLICATE_MAX_DISTANCE
+
+# Progress of the current (or last) backfill in this process, served by /duplicate-graph/status
+backfill_status = {"running": False}
+_backfill_lock = threading.Lock()
+
+def _numeric_neighbours(question_ids, matches):
+    # Vector IDs are strings; only numeric ones refer to questions
+    return {
+        question_id: [(int(doc_id), distance) for doc_id, distance in neighbours if str(doc_id).isdigit()]
+        for question_id, neighbours in zip(question_ids, matches)
+    }
+
+def record_duplicates(db, vd, question_ids, texts=None, k=DUPLICATE_CHECK_K, max_distance=DUPLICATE_MAX_DISTANCE):
+    """
+    Run a bounded k-NN check for just-written questions and replace their edges
+    in the duplicate graph (question_duplicates) with the matches found within
+    max_distance. Without texts, the questions' stored embeddings are used.
+
+    Returns:
+        Number of neighbours recorded
+    """
+    question_ids = [int(question_id) for question_id in question_ids]
+    if not question_ids:
+        return 0
+    if texts is None:
+        found, embeddings = vd.get_embeddings(question_ids)
+        question_ids = [int(question_id) for question_id in found]
+        matches = vd.nearest_neighbours(None, k=k, max_distance=max_distance, exclude_ids=question_ids, embeddings=embeddings)
+    else:
+        matches = vd.nearest_neighbours(texts, k=k, max_distance=max_distance, exclude_ids=question_ids)
+    neighbours = _numeric_neighbours(question_ids, matches)
+    db.replace_duplicate_edges(neighbours)
+    return sum(len(found) for found in neighbours.values())
+
+def backfill_duplicate_graph(db, vd, batch_size=500, k=DUPLICATE_CHECK_K, max_distance=DUPLICATE_MAX_DISTANCE, progress=print):
+    """
+    Rebuild the duplicate graph for the whole bank.
+
+    The write-time check only records edges for questions added or edited
+    after it was deployed; this pass clears the graph and runs the same k-NN
+    check for every stored question, reusing stored embeddings and querying
+    one batch at a time.
+
+    Args:
+        db: DatabaseManager to read question IDs from and write edges to
+        vd: VectorDatabase holding the embeddings
+        batch_size: Questions queried per batch
+        k: Neighbours checked per question
+        max_distance: Largest vector distance recorded as an edge
+        progress: Callable receiving a progress line after every batch
+
+    Returns:
+        Dictionary with processed and neighbours counts
+    """
+    if not _backfill_lock.acquire(blocking=False):
+        raise RuntimeError("A duplicate graph backfill is already running")
+    try:
+        backfill_status.clear()
+        backfill_status.update(
+            running=True,
+            started_at=datetime.now().isoformat(),
+            total=db.get_stats().get("total_questions", 0),
+            processed=0,
+            neighbours=0
+        )
+        db.clear_duplicate_edges()
+        started = time.monotonic()
+        for batch in db.stream_questions(batch_size=batch_size):
+            question_ids = [question["question_id"] for question in batch]
+            found, embeddings = vd.get_embeddings(question_ids)
+            found = [int(question_id) for question_id in found]
+            matches = vd.nearest_neighbours(None, k=k, max_distance=max_distance, exclude_ids=found, embeddings=embeddings)
+            # Earlier batches' edges to these questions must survive, so only add
+            neighbours = _numeric_neighbours(found, matches)
+            db.replace_duplicate_edges(neighbours, replace=False)
+
+            backfill_status["processed"] += len(question_ids)
+            backfill_status["neighbours"] += sum(len(matched) for matched in neighbours.values())
+            rate = backfill_status["processed"] / max(time.monotonic() - started, 1e-9)
+            progress(
+                f"Checked {backfill_status['processed']}/{backfill_status['total']} questions "
+                f"({backfill_status['neighbours']} neighbours) at {rate:.0f} questions/s"
+            )
+        backfill_status["finished_at"] = datetime.now().isoformat()
+        return {key: backfill_status[key] for key in ("processed", "neighbours")}
+    except Exception as e:
+        backfill_status["error"] = str(e)
+        raise
+    finally:
+        backfill_status["running"] = False
+        _backfill_lock.release()
+
+if __name__ == "__main__":
+    from database_manager import DatabaseManager
+    from vector_database import VectorDatabase
+
+    parser = argparse.ArgumentParser(description="Rebuild the near-duplicate graph for the whole question bank")
+    parser.add_argument("--batch-size", type=int, default=500, help="Questions per batch")
+    parser.add_argument("--k", type=int, default=DUPLICATE_CHECK_K, help="Neighbours checked per question")
+    parser.add_argument("--max-distance", type=float, default=DUPLICATE_MAX_DISTANCE, help="Largest distance recorded")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    vd = VectorDatabase()
+    try:
+        summary = backfill_duplicate_graph(db, vd, batch_size=args.batch_size, k=args.k, max_distance=args.max_distance)
+        print(f"Backfill complete: {summary}")
+    finally:
+        db.close()
@@ -0,0 +1,336 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+SNAPSHOT_DTYPES = ("int8", "float16")
+MIN_CAPACITY = 1024  # Rows preallocated so small additions don't rewrite the file
+JOURNAL_COMPACT_LINES = 10000  # Journal entries replayed before the id map is rewritten
+
+class EmbeddingSnapshot:
+    """
+    Contiguous, quantized copy of every stored embedding, memory-mapped from disk.
+
+    Rows live in <directory>/embeddings.npy (int8 with a float32 scale per row,
+    or float16) and <directory>/embeddings_ids.json maps row positions to IDs.
+    Rows [0, count) are always live: deletes move the last row into the hole,
+    and the matrix is preallocated so upserts write in place.
+
+    Several processes (e.g. uvicorn workers) may read and write the same files.
+    Writes take an exclusive lock on <directory>/embeddings.lock and scans a
+    shared one, and every write first replays changes made by other processes.
+    Appends and deletes are recorded in a small journal next to the id map, which
+    is only rewritten every JOURNAL_COMPACT_LINES entries. Without fcntl (Windows)
+    the lock only covers threads, so a single writer process must be used.
+    """
+    def __init__(self, directory, dtype="int8"):
+        if dtype not in SNAPSHOT_DTYPES:
+            raise ValueError(f"Unsupported snapshot dtype: {dtype}")
+        self.dtype = dtype
+        self.directory = directory
+        self.matrix_path = os.path.join(directory, "embeddings.npy")
+        self.scales_path = os.path.join(directory, "embeddings_scales.npy")
+        self.ids_path = os.path.join(directory, "embeddings_ids.json")
+        self.lock_path = os.path.join(directory, "embeddings.lock")
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.matrix = None
+        self.scales = None
+        self.generation = 0
+        self._ids_mtime = None
+        self._journal_offset = 0
+        self._journal_lines = 0
+        self.lock = threading.RLock()
+        self._lock_depth = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    @property
+    def loaded(self) -> bool:
+        return self.matrix is not None
+
+    def _journal_path(self, generation):
+        return os.path.join(self.directory, f"embeddings_ids.{generation}.log")
+
+    @contextmanager
+    def locked(self, shared=False):
+        """
+        Holds the thread lock and the cross-process file lock (shared for readers).
+        Re-entrant within a thread; an inner request keeps the outer lock's mode.
+        """
+        with self.lock:
+            if fcntl is None or self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            os.makedirs(self.directory or ".", exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self) -> bool:
+        """
+        Memory-maps the snapshot files if they exist and match this dtype.
+        Returns True if a snapshot was loaded.
+        """
+        with self.locked(shared=True):
+            return self._load()
+
+    def _unload(self):
+        self.matrix = self.scales = None
+        self.ids, self.positions = [], {}
+        self._ids_mtime = None
+
+    def _load(self) -> bool:
+        if not os.path.exists(self.ids_path):
+            self._unload()
+            return False
+        try:
+            with open(self.ids_path) as f:
+                id_map = json.load(f)
+            if id_map.get("dtype") != self.dtype:
+                print(f"Ignoring {self.dtype} snapshot request: {self.ids_path} holds {id_map.get('dtype')}")
+                self._unload()
+                return False
+            self.matrix = np.load(self.matrix_path, mmap_mode="r+")
+            self.scales = np.load(self.scales_path, mmap_mode="r+")
+            self.ids = id_map["ids"]
+            self.positions = {doc_id: position for position, doc_id in enumerate(self.ids)}
+            self.generation = id_map.get("generation", 0)
+            self._ids_mtime = os.stat(self.ids_path).st_mtime_ns
+            self._journal_offset = self._journal_lines = 0
+            self._replay_journal()
+            return True
+        except Exception as e:
+            print(f"Error loading embedding snapshot: {e}")
+            self._unload()
+            return False
+
+    def _replay_journal(self):
+        """
+        Applies journal entries written since this process last read the journal.
+        """
+        try:
+            with open(self._journal_path(self.generation), "rb") as f:
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            operation, value = json.loads(line)
+            if operation == "a":
+                self.positions[value] = len(self.ids)
+                self.ids.append(value)
+            else:
+                self._remove_position(value)
+            self._journal_lines += 1
+        self._journal_offset += complete
+
+    def _remove_position(self, position):
+        last = len(self.ids) - 1
+        del self.positions[self.ids[position]]
+        if position != last:
+            moved_id = self.ids[last]
+            self.ids[position] = moved_id
+            self.positions[moved_id] = position
+        self.ids.pop()
+
+    def _refresh(self):
+        """
+        Brings this process's view up to date with the files; call with the lock held.
+        """
+        try:
+            mtime = os.stat(self.ids_path).st_mtime_ns
+        except OSError:
+            self._unload()
+            return
+        if not self.loaded or mtime != self._ids_mtime:
+            self._load()
+        else:
+            self._replay_journal()
+
+    def reload_if_changed(self):
+        """
+        Picks up changes written by other processes since this one last looked.
+        """
+        with self.locked(shared=True):
+            self._refresh()
+
+    def _quantize(self, embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.dtype == "float16":
+            return embeddings.astype(np.float16), np.ones(len(embeddings), dtype=np.float32)
+        # Symmetric per-row int8: x ~= q * scale
+        scales = np.abs(embeddings).max(axis=1) / 127 if embeddings.size else np.zeros(len(embeddings), dtype=np.float32)
+        scales = scales.astype(np.float32)
+        safe_scales = np.where(scales > 0, scales, 1.0)
+        quantized = np.clip(np.rint(embeddings / safe_scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales
+
+    def rows(self, start, stop) -> np.ndarray:
+        """
+        Dequantized float32 copy of rows [start, stop).
+        """
+        block = self.matrix[start:stop].astype(np.float32)
+        if self.dtype == "int8":
+            block *= self.scales[start:stop, None]
+        return block
+
+    def _allocate(self, capacity, dim, suffix):
+        dtype = np.int8 if self.dtype == "int8" else np.float16
+        matrix = np.lib.format.open_memmap(self.matrix_path + suffix, mode="w+", dtype=dtype, shape=(capacity, dim))
+        scales = np.lib.format.open_memmap(self.scales_path + suffix, mode="w+", dtype=np.float32, shape=(capacity,))
+        return matrix, scales
+
+    def _save_ids(self):
+        """
+        Rewrites the id map under a new generation and drops the old journal.
+        """
+        old_journal = self._journal_path(self.generation)
+        self.generation += 1
+        # A journal left behind under this generation (e.g. by an invalidated snapshot) is stale
+        if os.path.exists(self._journal_path(self.generation)):
+            os.remove(self._journal_path(self.generation))
+        temp_path = self.ids_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"dtype": self.dtype, "generation": self.generation, "ids": self.ids}, f)
+        os.replace(temp_path, self.ids_path)
+        self._ids_mtime = os.stat(self.ids_path).st_mtime_ns
+        self._journal_offset = self._journal_lines = 0
+        if os.path.exists(old_journal):
+            os.remove(old_journal)
+
+    def _append_journal(self, entries):
+        """
+        Records id map changes; rows must already be flushed.
+        """
+        if not entries:
+            return
+        if self._journal_lines + len(entries) > JOURNAL_COMPACT_LINES:
+            self._save_ids()
+            return
+        data = "".join(json.dumps(entry) + "\n" for entry in entries).encode()
+        with open(self._journal_path(self.generation), "ab") as f:
+            f.write(data)
+        self._journal_offset += len(data)
+        self._journal_lines += len(entries)
+
+    def rebuild(self, batches: Iterable[Tuple[List[str], np.ndarray]], count, dim):
+        """
+        Writes a fresh snapshot from (ids, embeddings) batches totalling count rows,
+        replacing any existing files atomically.
+        """
+        with self.locked():
+            os.makedirs(os.path.dirname(self.matrix_path) or ".", exist_ok=True)
+            if os.path.exists(self.ids_path):
+                self._refresh()  # Continue the current generation sequence
+            matrix, scales = self._allocate(max(count, MIN_CAPACITY), dim, ".tmp")
+            ids = []
+            for batch_ids, embeddings in batches:
+                start = len(ids)
+                quantized, batch_scales = self._quantize(embeddings)
+                matrix[start:start + len(batch_ids)] = quantized
+                scales[start:start + len(batch_ids)] = batch_scales
+                ids.extend(str(doc_id) for doc_id in batch_ids)
+            matrix.flush()
+            scales.flush()
+            del matrix, scales
+            os.replace(self.matrix_path + ".tmp", self.matrix_path)
+            os.replace(self.scales_path + ".tmp", self.scales_path)
+            self.ids = ids
+            self._save_ids()
+            self._load()
+
+    def _grow(self, needed):
+        capacity, dim = self.matrix.shape
+        new_capacity = max(needed, capacity * 2, MIN_CAPACITY)
+        matrix, scales = self._allocate(new_capacity, dim, ".tmp")
+        matrix[:self.count] = self.matrix[:self.count]
+        scales[:self.count] = self.scales[:self.count]
+        matrix.flush()
+        scales.flush()
+        del matrix, scales
+        os.replace(self.matrix_path + ".tmp", self.matrix_path)
+        os.replace(self.scales_path + ".tmp", self.scales_path)
+        self.matrix = np.load(self.matrix_path, mmap_mode="r+")
+        self.scales = np.load(self.scales_path, mmap_mode="r+")
+        # A new id map generation makes other processes re-map the new files
+        self._save_ids()
+
+    def upsert(self, ids, embeddings):
+        """
+        Overwrites the rows of existing ids in place and appends new ones.
+        """
+        if not len(ids):
+            return
+        quantized, scales = self._quantize(embeddings)
+        with self.locked():
+            self._refresh()
+            if not self.loaded:
+                return
+            ids = [str(doc_id) for doc_id in ids]
+            new_ids = [doc_id for doc_id in dict.fromkeys(ids) if doc_id not in self.positions]
+            if self.count + len(new_ids) > self.matrix.shape[0]:
+                self._grow(self.count + len(new_ids))
+            for doc_id in new_ids:
+                self.positions[doc_id] = len(self.ids)
+                self.ids.append(doc_id)
+            positions = np.fromiter((self.positions[doc_id] for doc_id in ids), dtype=np.int64, count=len(ids))
+            self.matrix[positions] = quantized
+            self.scales[positions] = scales
+            self.matrix.flush()
+            self.scales.flush()
+            self._append_journal([["a", doc_id] for doc_id in new_ids])
+
+    def delete(self, ids):
+        """
+        Removes rows by moving the last live row into each hole.
+        """
+        with self.locked():
+            self._refresh()
+            if not self.loaded:
+                return
+            removed = []
+            for doc_id in map(str, ids):
+                position = self.positions.get(doc_id)
+                if position is None:
+                    continue
+                last = len(self.ids) - 1
+                if position != last:
+                    self.matrix[position] = self.matrix[last]
+                    self.scales[position] = self.scales[last]
+                self._remove_position(position)
+                removed.append(["d", position])
+            if removed:
+                self.matrix.flush()
+                self.scales.flush()
+                self._append_journal(removed)
+
+    def invalidate(self):
+        """
+        Removes the id map so every process re-exports the snapshot before its next scan.
+        """
+        with self.locked():
+            for path in (self.ids_path, self._journal_path(self.generation)):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._unload()
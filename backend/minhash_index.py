@@ -0,0 +1,297 @@
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from text_embedding import char_ngram_hashes, normalize_text
+
+MAX_HASH = np.uint64(0xFFFFFFFF)
+SHINGLE_SIZE = 5  # Character shingles per question text
+SHINGLE_BLOCK = 65536  # Shingles permuted per vectorized pass
+PAIR_CHUNK = 65536  # Candidate pairs verified per vectorized pass
+PENDING_PAIRS = 1 << 20  # Candidate pairs collected before they are deduplicated and verified
+MAX_BUCKET_SIZE = 1000  # Larger buckets are too common to discriminate and are skipped in sweeps
+DEFAULT_INDEX_PATH = os.path.join("VectorDataBase", "minhash_index.npz")
+
+class MinHashIndex:
+    """
+    Near-duplicate index over MinHash signatures with banded LSH.
+
+    Each question's character shingles are summarized by num_perm MinHash
+    values; signatures are split into bands and every band is hashed into a
+    bucket. Documents sharing any bucket are candidates, and candidates are
+    verified by estimated Jaccard similarity, so lookups and full sweeps never
+    compare all pairs.
+    """
+    def __init__(self, num_perm=128, bands=32, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        generator = np.random.RandomState(seed)
+        # Multiply-shift permutations: (a*x + b mod 2**64) >> 32 with odd a
+        self.a = generator.randint(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = generator.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.buckets: List[Dict[int, set]] = [defaultdict(set) for _ in range(bands)]
+        self.bank_version = None
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def signatures_for(self, texts: List[str]) -> np.ndarray:
+        """
+        Computes MinHash signatures for texts.
+        Texts shorter than a shingle use their whole (padded) text as the only shingle.
+        Returns a uint32 matrix with one row per text; empty texts get all-max rows.
+        """
+        texts = [normalize_text(text) for text in texts]
+        signatures = np.full((len(texts), self.num_perm), MAX_HASH, dtype=np.uint64)
+        owners, hashes = char_ngram_hashes(texts, SHINGLE_SIZE)
+        short = [index for index, text in enumerate(texts) if text and len(text) + 2 < SHINGLE_SIZE]
+        for index in short:
+            # char_ngram_hashes pads with one space on each side
+            _, whole = char_ngram_hashes([texts[index]], len(texts[index]) + 2)
+            owners = np.concatenate((owners, np.full(len(whole), index, dtype=np.int64)))
+            hashes = np.concatenate((hashes, whole))
+        if len(hashes) == 0:
+            return signatures.astype(np.uint32)
+
+        # Identical shingles within a text do not change its minimum
+        keys = np.unique((owners.astype(np.uint64) << np.uint64(32)) | (hashes >> np.uint64(32)))
+        owners = (keys >> np.uint64(32)).astype(np.int64)
+        shingles = keys & MAX_HASH
+        for start in range(0, len(shingles), SHINGLE_BLOCK):
+            block_owners = owners[start:start + SHINGLE_BLOCK]
+            # One row per permutation keeps the reduction over contiguous memory
+            permuted = self.a[:, None] * shingles[None, start:start + SHINGLE_BLOCK]
+            permuted += self.b[:, None]
+            permuted >>= np.uint64(32)
+            # Owners are sorted, so each text is one contiguous run of columns
+            starts = np.flatnonzero(np.r_[True, block_owners[1:] != block_owners[:-1]])
+            minimums = np.minimum.reduceat(permuted, starts, axis=1).T
+            block_texts = block_owners[starts]
+            signatures[block_texts] = np.minimum(signatures[block_texts], minimums)
+        return signatures.astype(np.uint32)
+
+    @staticmethod
+    def _is_empty(signatures: np.ndarray) -> np.ndarray:
+        """
+        Marks signatures of texts without shingles; they are never bucketed or matched.
+        """
+        return (signatures == MAX_HASH).all(axis=1)
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """
+        Hashes each band of each signature into a 64-bit bucket key, shape (len, bands).
+        """
+        banded = signatures.astype(np.uint64).reshape(len(signatures), self.bands, self.rows)
+        keys = np.full(banded.shape[:2], np.uint64(0xCBF29CE484222325), dtype=np.uint64)
+        for row in range(self.rows):
+            keys ^= banded[:, :, row]
+            keys *= np.uint64(0x100000001B3)
+        return keys
+
+    def add_many(self, ids, texts):
+        """
+        Adds or replaces the signatures of the given documents.
+        """
+        ids = [str(id) for id in ids]
+        if not ids:
+            return
+        signatures = self.signatures_for(list(texts))
+        band_keys = self._band_keys(signatures)
+        empty = self._is_empty(signatures)
+        with self.lock:
+            self.remove_many(ids)
+            for doc_id, signature, keys, is_empty in zip(ids, signatures, band_keys, empty):
+                self.signatures[doc_id] = signature
+                if is_empty:
+                    continue
+                for band, key in enumerate(keys.tolist()):
+                    self.buckets[band][key].add(doc_id)
+
+    def add(self, id, text):
+        self.add_many([id], [text])
+
+    def remove_many(self, ids):
+        """
+        Removes documents from the index; unknown ids are ignored.
+        """
+        with self.lock:
+            present = [str(id) for id in ids if str(id) in self.signatures]
+            if not present:
+                return
+            band_keys = self._band_keys(np.stack([self.signatures[doc_id] for doc_id in present]))
+            for doc_id, keys in zip(present, band_keys):
+                for band, key in enumerate(keys.tolist()):
+                    bucket = self.buckets[band].get(key)
+                    if bucket is not None:
+                        bucket.discard(doc_id)
+                        if not bucket:
+                            del self.buckets[band][key]
+                del self.signatures[doc_id]
+
+    def remove(self, id):
+        self.remove_many([id])
+
+    def query(self, text, threshold=0.8, limit=None, exclude_id=None) -> List[Tuple[str, float]]:
+        """
+        Finds indexed documents whose estimated Jaccard similarity to text is at least threshold.
+        Returns (id, similarity) tuples, most similar first.
+        """
+        signature = self.signatures_for([text])
+        if self._is_empty(signature)[0]:
+            return []
+        with self.lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)[0].tolist()):
+                candidates.update(self.buckets[band].get(key, ()))
+            candidates.discard(str(exclude_id) if exclude_id is not None else None)
+            if not candidates:
+                return []
+            candidate_ids = list(candidates)
+            matrix = np.stack([self.signatures[doc_id] for doc_id in candidate_ids])
+        similarities = (matrix == signature).mean(axis=1)
+        results = sorted(
+            ((doc_id, float(similarity)) for doc_id, similarity in zip(candidate_ids, similarities) if similarity >= threshold),
+            key=lambda result: -result[1]
+        )
+        return results[:limit] if limit else results
+
+    def find_duplicate_pairs(self, threshold=0.2, n=2) -> List[Tuple[str, str, float]]:
+        """
+        Finds near-duplicate pairs by comparing only documents that share an LSH bucket.
+
+        Candidate pairs are collected per bucket and verified in fixed-size chunks,
+        keeping only those closer than threshold, so memory stays bounded however
+        many candidates there are. Buckets with more than MAX_BUCKET_SIZE members
+        are skipped; true duplicates share many bands and are found through others.
+
+        As with VectorDatabase.find_redundant_pairs, each document keeps at most its
+        n - 1 most similar neighbours. Distances are 1 - estimated Jaccard similarity,
+        and threshold is a maximum distance as for the vector scan.
+
+        Returns a list of (id_a, id_b, distance) tuples sorted by distance.
+        """
+        with self.lock:
+            ids = list(self.signatures)
+            if len(ids) < 2:
+                return []
+            positions = {doc_id: position for position, doc_id in enumerate(ids)}
+            matrix = np.stack([self.signatures[doc_id] for doc_id in ids])
+            groups = [
+                np.array(sorted(positions[doc_id] for doc_id in bucket), dtype=np.int64)
+                for band_buckets in self.buckets
+                for bucket in band_buckets.values()
+                if 2 <= len(bucket) <= MAX_BUCKET_SIZE
+            ]
+        count = len(ids)
+        similar = {}  # i * count + j -> distance, for verified pairs only
+
+        def verify(pending):
+            keys = np.unique(np.concatenate(pending))
+            for start in range(0, len(keys), PAIR_CHUNK):
+                chunk = keys[start:start + PAIR_CHUNK]
+                i, j = chunk // count, chunk % count
+                distances = 1 - (matrix[i] == matrix[j]).mean(axis=1)
+                keep = distances < threshold
+                similar.update(zip(chunk[keep].tolist(), distances[keep].tolist()))
+
+        pending, pending_count = [], 0
+        for members in groups:
+            first, second = np.triu_indices(len(members), k=1)
+            pending.append(members[first] * count + members[second])
+            pending_count += len(first)
+            if pending_count >= PENDING_PAIRS:
+                verify(pending)
+                pending, pending_count = [], 0
+        if pending:
+            verify(pending)
+        if not similar:
+            return []
+
+        # Keep each document's n - 1 nearest neighbours
+        k = max(n - 1, 1)
+        neighbours = defaultdict(list)
+        for key, distance in similar.items():
+            i, j = divmod(key, count)
+            neighbours[i].append((distance, i, j))
+            neighbours[j].append((distance, i, j))
+        kept = {}
+        for candidates_of_doc in neighbours.values():
+            for distance, i, j in sorted(candidates_of_doc)[:k]:
+                kept[(i, j)] = distance
+        return sorted(
+            ((ids[i], ids[j], distance) for (i, j), distance in kept.items()),
+            key=lambda pair: pair[2]
+        )
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        """
+        Writes the signatures (and the bank version they reflect) to path atomically.
+        Buckets are rebuilt from the signatures on load.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self.lock:
+            ids = list(self.signatures)
+            matrix = np.stack([self.signatures[doc_id] for doc_id in ids]) if ids else np.zeros((0, self.num_perm), dtype=np.uint32)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(
+                f,
+                ids=np.array(ids, dtype=str),
+                signatures=matrix,
+                settings=np.array([self.num_perm, self.bands]),
+                bank_version=np.array(-1 if self.bank_version is None else self.bank_version)
+            )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH, num_perm=128, bands=32) -> "MinHashIndex":
+        """
+        Loads an index saved with save(), or returns an empty index if there is none
+        (or it was built with different settings).
+        """
+        index = cls(num_perm=num_perm, bands=bands)
+        if not os.path.exists(path):
+            return index
+        try:
+            with np.load(path) as data:
+                if tuple(data["settings"].tolist()) != (num_perm, bands):
+                    print(f"Ignoring MinHash index in {path}: built with different settings")
+                    return index
+                ids = data["ids"].tolist()
+                signatures = data["signatures"]
+                bank_version = int(data["bank_version"])
+        except Exception as e:
+            print(f"Error loading MinHash index from {path}: {e}")
+            return index
+
+        band_keys = index._band_keys(signatures) if len(ids) else []
+        empty = index._is_empty(signatures) if len(ids) else []
+        for doc_id, signature, keys, is_empty in zip(ids, signatures, band_keys, empty):
+            index.signatures[doc_id] = signature
+            if is_empty:
+                continue
+            for band, key in enumerate(keys.tolist()):
+                index.buckets[band][key].add(doc_id)
+        index.bank_version = None if bank_version < 0 else bank_version
+        return index
+
+if __name__ == "__main__":
+    index = MinHashIndex()
+    index.add_many(
+        ["1", "2", "3"],
+        [
+            "The Indian Navy is the naval branch of the Indian Armed Forces.",
+            "The Indian Navy is the naval branch of the Indian armed forces!",
+            "ChromaDB is an open-source embedding database."
+        ]
+    )
+    print(index.find_duplicate_pairs(threshold=0.3))
+    print(index.query("the indian navy is the naval branch of the indian armed forces", threshold=0.5))
@@ -0,0 +1,28 @@
+from typing import Dict, Hashable, List, Optional, Sequence
+
+RRF_K = 60  # Damping constant from the original reciprocal rank fusion paper
+
+def reciprocal_rank_fusion(rankings: Dict[str, Sequence[Hashable]], k: int = RRF_K,
+                           weights: Optional[Dict[str, float]] = None) -> List[dict]:
+    """
+    Merges ranked ID lists from several retrievers with reciprocal rank fusion.
+
+    Args:
+        rankings: Retriever name -> IDs, best first
+        k: Damping constant; larger values flatten the gap between top ranks
+        weights: Optional retriever name -> weight (default 1.0)
+
+    Returns:
+        List of {"id", "score", "sources", "ranks"} dictionaries, highest score first,
+        where score = sum(weight / (k + rank)) over the retrievers that returned the ID
+    """
+    weights = weights or {}
+    fused: Dict[Hashable, dict] = {}
+    for source, ids in rankings.items():
+        weight = weights.get(source, 1.0)
+        for rank, item_id in enumerate(dict.fromkeys(ids), start=1):
+            entry = fused.setdefault(item_id, {"id": item_id, "score": 0.0, "sources": [], "ranks": {}})
+            entry["score"] += weight / (k + rank)
+            entry["sources"].append(source)
+            entry["ranks"][source] = rank
+    return sorted(fused.values(), key=lambda entry: (-entry["score"], min(entry["ranks"].values())))
@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from duplicate_graph import record_duplicates
+from vector_database import VECTOR_DB_PATH, build_vector_metadata, build_vector_text
+
+STATE_PATH = os.path.join(VECTOR_DB_PATH, "reconcile_state.json")
+# Rows committed by transactions that were still open at the last run can carry
+# an updated_at just before its watermark, so each run looks back this far
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+_reconcile_lock = threading.Lock()
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable reconcile state {path}: {e}")
+        return {}
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+def reconcile(db, vd, batch_size=1000, full=False, state_path=STATE_PATH):
+    """
+    Bring the vector store back in line with Postgres, touching only what drifted.
+
+    IDs present in Postgres but not in Chroma are embedded and added, vectors
+    whose question no longer exists are deleted, and questions modified since
+    the previous run (updated_at after its watermark) are re-embedded only if
+    their content hash differs from the stored one. With full=True (or after
+    an embedding model change) every question's hash is checked.
+
+    Args:
+        db: DatabaseManager to read questions from
+        vd: VectorDatabase to repair
+        batch_size: Questions fetched and upserted per batch
+        full: Check every question instead of only recently modified ones
+        state_path: Where the watermark of the last run is stored
+
+    Returns:
+        Dictionary with counts of missing, updated, unchanged, orphaned and failed vectors
+    """
+    if not _reconcile_lock.acquire(blocking=False):
+        raise RuntimeError("A reconcile is already running")
+    try:
+        started_at = db.get_database_time()
+        state = load_state(state_path)
+        if state.get("embedding_model") != vd.embedding_model:
+            full = True
+
+        summary = {"missing": 0, "updated": 0, "unchanged": 0, "orphaned": 0, "failed": 0}
+
+        def refresh_duplicates(question_ids):
+            # Re-embedded questions can have new near-duplicates
+            try:
+                record_duplicates(db, vd, question_ids)
+            except Exception as e:
+                print(f"Duplicate check failed: {e}")
+
+        def upsert(questions, upserted_key):
+            result = vd.upsert_many(
+                [question["question_id"] for question in questions],
+                [build_vector_text(question) for question in questions],
+                metadatas=[build_vector_metadata(question) for question in questions]
+            )
+            summary[upserted_key] += len(result["upserted"])
+            refresh_duplicates(result["upserted"])
+            summary["unchanged"] += len(result["skipped"]) + len(result["metadata_updated"])
+            summary["failed"] += sum(len(failure["ids"]) for failure in result["failed"])
+
+        # Vector IDs are read first: questions are written to Postgres before the
+        # vector store, so one added between the two reads shows up as missing
+        # (and is upserted) rather than as an orphan that would be deleted
+        vector_ids = set(vd.get_ids())
+        sql_ids = {str(question_id) for question_id in db.get_question_ids()}
+
+        # Vectors whose question was deleted
+        orphaned = sorted(vector_ids - sql_ids)
+        if orphaned:
+            result = vd.delete_many(orphaned)
+            summary["orphaned"] = len(result["deleted"])
+            summary["failed"] += sum(len(failure["ids"]) for failure in result["failed"])
+
+        # Questions that were never indexed
+        missing = sorted((int(question_id) for question_id in sql_ids - vector_ids), reverse=True)
+        for start in range(0, len(missing), batch_size):
+            upsert(db.get_questions(missing[start:start + batch_size])["questions"], "missing")
+
+        # Questions modified since the last run; unchanged texts are skipped by hash
+        updated_since = None
+        if not full and state.get("watermark"):
+            updated_since = datetime.fromisoformat(state["watermark"]) - WATERMARK_OVERLAP
+        missing_ids = set(missing)
+        for batch in db.stream_questions(batch_size=batch_size, updated_since=updated_since):
+            batch = [question for question in batch if question["question_id"] not in missing_ids]
+            if batch:
+                upsert(batch, "updated")
+
+        if summary["missing"] or summary["updated"] or summary["orphaned"]:
+            # Vectors changed without a bank version change
+            db.delete_redundancy_reports(method="vector")
+
+        save_state({
+            "watermark": started_at.isoformat(),
+            "embedding_model": vd.embedding_model,
+            "last_run": datetime.now().isoformat(),
+            "summary": summary
+        }, state_path)
+        return summary
+    finally:
+        _reconcile_lock.release()
+
+if __name__ == "__main__":
+    from database_manager import DatabaseManager
+    from vector_database import VectorDatabase
+
+    parser = argparse.ArgumentParser(description="Repair drift between the question bank and the vector database")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Questions per batch")
+    parser.add_argument("--full", action="store_true", help="Check every question, not only recently modified ones")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    vd = VectorDatabase()
+    try:
+        print(f"Reconcile complete: {reconcile(db, vd, batch_size=args.batch_size, full=args.full)}")
+    finally:
+        db.close()
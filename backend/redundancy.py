@@ -0,0 +1,84 @@
+from collections import defaultdict
+from typing import Dict, Hashable, List, Tuple
+
+class UnionFind:
+    """
+    Disjoint-set forest with path halving and union by size.
+    """
+    def __init__(self):
+        self.parent: Dict[Hashable, Hashable] = {}
+        self.size: Dict[Hashable, int] = {}
+
+    def find(self, item):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+            return item
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+def group_duplicate_pairs(pairs: List[Tuple[str, str, float]]) -> List[dict]:
+    """
+    Groups near-duplicate pairs into connected clusters.
+
+    Args:
+        pairs: (id_a, id_b, distance) tuples, e.g. from VectorDatabase.find_redundant_pairs
+
+    Returns:
+        List of clusters, largest first, each with its question_ids and the
+        pairs (with distances) that connect them
+    """
+    union_find = UnionFind()
+    for id_a, id_b, _ in pairs:
+        union_find.union(id_a, id_b)
+
+    clusters: Dict[Hashable, dict] = {}
+    for id_a, id_b, distance in pairs:
+        cluster = clusters.setdefault(union_find.find(id_a), {"question_ids": set(), "pairs": []})
+        cluster["question_ids"].update((id_a, id_b))
+        cluster["pairs"].append({"question_ids": [id_a, id_b], "distance": distance})
+
+    result = []
+    for cluster in clusters.values():
+        question_ids = sorted(cluster["question_ids"], key=_id_sort_key)
+        result.append({
+            "question_ids": question_ids,
+            "pairs": sorted(cluster["pairs"], key=lambda pair: pair["distance"]),
+            "min_distance": min(pair["distance"] for pair in cluster["pairs"])
+        })
+    result.sort(key=lambda cluster: (-len(cluster["question_ids"]), cluster["min_distance"]))
+    return result
+
+def keep_nearest_pairs(pairs: List[Tuple[str, str, float]], n=2) -> List[Tuple[str, str, float]]:
+    """
+    Keeps the pairs among each document's n - 1 nearest neighbours, matching the
+    n semantics of VectorDatabase.find_redundant_pairs.
+
+    Returns the kept (id_a, id_b, distance) tuples sorted by distance.
+    """
+    k = max(n - 1, 1)
+    neighbours = defaultdict(list)
+    for pair in pairs:
+        neighbours[pair[0]].append(pair)
+        neighbours[pair[1]].append(pair)
+    kept = set()
+    for candidates in neighbours.values():
+        kept.update(sorted(candidates, key=lambda pair: pair[2])[:k])
+    return sorted(kept, key=lambda pair: pair[2])
+
+def _id_sort_key(question_id):
+    # Chroma IDs are strings; order numeric IDs numerically
+    text = str(question_id)
+    return (0, int(text), "") if text.isdigit() else (1, 0, text)
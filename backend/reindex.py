@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from duplicate_graph import record_duplicates
+from text_embedding import HashingNgramEmbedder
+from vector_database import VECTOR_DB_PATH, build_vector_metadata, build_vector_text
+
+CHECKPOINT_PATH = os.path.join(VECTOR_DB_PATH, "reindex_checkpoint.json")
+
+# Progress of the current (or last) run in this process, served by /reindex/status
+reindex_status = {"running": False}
+_reindex_lock = threading.Lock()
+
+_worker_embedder = None
+
+def _init_worker(dim, idf):
+    global _worker_embedder
+    _worker_embedder = HashingNgramEmbedder(dim=dim, idf=idf)
+
+def _embed_in_worker(texts):
+    return _worker_embedder.transform(texts)
+
+def load_checkpoint(path=CHECKPOINT_PATH):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable reindex checkpoint {path}: {e}")
+        return None
+
+def save_checkpoint(checkpoint, path=CHECKPOINT_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(temp_path, path)
+
+def _chunks(items, count):
+    size = max(1, -(-len(items) // count))
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+def reindex(db, vd, batch_size=500, workers=0, restart=False, fit_idf=False, checkpoint_path=CHECKPOINT_PATH, progress=print):
+    """
+    Rebuild the vector store from Postgres.
+
+    Questions are streamed from the database in question_id order (newest
+    first), embedded in batches and upserted; rows whose stored content hash
+    is unchanged are skipped. After every batch the last question_id is
+    written to a checkpoint, so an interrupted run resumes after it.
+
+    Args:
+        db: DatabaseManager to read questions from
+        vd: VectorDatabase to write to
+        batch_size: Questions fetched, embedded and upserted per batch
+        workers: Embed with this many processes (local n-gram backend only; 0 = in process)
+        restart: Ignore an existing checkpoint and start from the newest question
+        fit_idf: Refit the local embedder's IDF weights on the whole bank first (implies restart)
+        checkpoint_path: Where the checkpoint is stored
+        progress: Callable receiving a progress line after every batch
+
+    Returns:
+        Dictionary with processed, upserted, skipped and failed counts
+    """
+    if not _reindex_lock.acquire(blocking=False):
+        raise RuntimeError("A reindex is already running")
+    try:
+        if fit_idf and vd.ngram_embedder is not None:
+            texts = [build_vector_text(question) for batch in db.stream_questions(batch_size=batch_size) for question in batch]
+            vd.fit_local_embedder(texts)
+            progress(f"Fitted IDF weights on {len(texts)} questions ({vd.embedding_model})")
+            restart = True
+        elif fit_idf:
+            progress(f"IDF weights only apply to the ngram backend; not fitting for {vd.embedding_model}")
+
+        checkpoint = None if restart else load_checkpoint(checkpoint_path)
+        if checkpoint and checkpoint.get("embedding_model") != vd.embedding_model:
+            progress("Embedding model changed since the checkpoint; starting over")
+            checkpoint = None
+        if checkpoint and checkpoint.get("completed"):
+            checkpoint = None
+        if checkpoint:
+            progress(f"Resuming after question {checkpoint['last_question_id']} ({checkpoint['processed']} already processed)")
+        else:
+            checkpoint = {
+                "embedding_model": vd.embedding_model,
+                "started_at": datetime.now().isoformat(),
+                "last_question_id": None,
+                "processed": 0,
+                "upserted": 0,
+                "skipped": 0,
+                "failed": 0,
+                "completed": False
+            }
+        checkpoint["total"] = db.get_stats().get("total_questions", 0)
+        reindex_status.clear()
+        reindex_status.update(checkpoint, running=True)
+
+        executor = None
+        if workers and workers > 1:
+            if vd.ngram_embedder is not None:
+                executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_init_worker,
+                    initargs=(vd.ngram_embedder.dim, vd.ngram_embedder.idf)
+                )
+            else:
+                progress("Process pool embedding needs the local n-gram backend; embedding in process")
+
+        started = time.monotonic()
+        session_processed = 0
+        try:
+            for batch in db.stream_questions(batch_size=batch_size, cursor=checkpoint["last_question_id"]):
+                ids = [str(question["question_id"]) for question in batch]
+                texts = [build_vector_text(question) for question in batch]
+
+                metadatas = [build_vector_metadata(question) for question in batch]
+
+                # Only embed questions whose text changed since they were indexed;
+                # questions whose tags or fields changed only get their metadata patched
+                plan = vd.plan_upsert(ids, texts, metadatas)
+                changed = plan["embed"]
+                if changed:
+                    changed_texts = [texts[index] for index in changed]
+                    if executor is not None:
+                        embeddings = np.vstack(list(executor.map(_embed_in_worker, _chunks(changed_texts, workers))))
+                    else:
+                        embeddings = vd.embed_many(changed_texts)
+                    result = vd.upsert_many(
+                        [ids[index] for index in changed],
+                        changed_texts,
+                        skip_unchanged=False,
+                        embeddings=embeddings,
+                        metadatas=[metadatas[index] for index in changed]
+                    )
+                    checkpoint["upserted"] += len(result["upserted"])
+                    # Re-embedded questions can have new near-duplicates
+                    try:
+                        record_duplicates(db, vd, result["upserted"])
+                    except Exception as e:
+                        print(f"Duplicate check failed: {e}")
+                    checkpoint["failed"] += sum(len(failure["ids"]) for failure in result["failed"])
+                if plan["metadata"]:
+                    result = vd.update_metadatas(
+                        [ids[index] for index in plan["metadata"]],
+                        list(plan["metadata"].values())
+                    )
+                    checkpoint["failed"] += sum(len(failure["ids"]) for failure in result["failed"])
+                checkpoint["skipped"] += len(ids) - len(changed)
+                checkpoint["processed"] += len(ids)
+                checkpoint["last_question_id"] = batch[-1]["question_id"]
+                save_checkpoint(checkpoint, checkpoint_path)
+                reindex_status.update(checkpoint)
+
+                session_processed += len(ids)
+                rate = session_processed / max(time.monotonic() - started, 1e-9)
+                progress(
+                    f"Reindexed {checkpoint['processed']}/{checkpoint['total']} "
+                    f"(upserted {checkpoint['upserted']}, skipped {checkpoint['skipped']}, "
+                    f"failed {checkpoint['failed']}) at {rate:.0f} questions/s"
+                )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if checkpoint["upserted"]:
+            # Vectors changed without a bank version change
+            db.delete_redundancy_reports(method="vector")
+        checkpoint["completed"] = True
+        checkpoint["finished_at"] = datetime.now().isoformat()
+        save_checkpoint(checkpoint, checkpoint_path)
+        reindex_status.update(checkpoint)
+        return {key: checkpoint[key] for key in ("processed", "upserted", "skipped", "failed")}
+    except Exception as e:
+        reindex_status["error"] = str(e)
+        raise
+    finally:
+        reindex_status["running"] = False
+        _reindex_lock.release()
+
+if __name__ == "__main__":
+    from database_manager import DatabaseManager
+    from vector_database import VectorDatabase
+
+    parser = argparse.ArgumentParser(description="Rebuild the vector database from the question bank")
+    parser.add_argument("--batch-size", type=int, default=500, help="Questions per batch")
+    parser.add_argument("--workers", type=int, default=0, help="Embedding processes (local n-gram backend)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    parser.add_argument("--fit-idf", action="store_true", help="Refit the local embedder's IDF weights first")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    vd = VectorDatabase()
+    try:
+        summary = reindex(db, vd, batch_size=args.batch_size, workers=args.workers, restart=args.restart, fit_idf=args.fit_idf)
+        print(f"Reindex complete: {summary}")
+    finally:
+        db.close()
@@ -21,6 +21,9 @@ class Question(BaseModel):
     language : Optional[str] = "English"
     image_required: Optional[bool] = False
 
+class BulkQuestions(BaseModel):
+    questions: List[Question]
+
 class QuestionUpdate(BaseModel):
     question: Optional[str] = None
     question_type: Optional[Literal["MCQ", "Short Answer", "Long Answer" , "oneword", "True/False"]] = None
@@ -38,6 +41,17 @@ class RedundantQuestion(BaseModel):
 class RedundantDataCheck(BaseModel):
     threshold: float = 0.8
     n: int = 2
+    refresh: bool = False
+    method: Literal["vector", "minhash", "graph"] = "vector"
+
+class ReindexRequest(BaseModel):
+    batch_size: int = 500
+    workers: int = 0
+    restart: bool = False
+    fit_idf: bool = False
+
+class DuplicateGraphBackfillRequest(BaseModel):
+    batch_size: int = 500
 
 class ExportRequest(BaseModel):
     question_ids: List[int] = []
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import re
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+FNV_PRIME = np.uint64(0x100000001B3)
+MIX_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+SEPARATOR = 0  # Byte placed between documents; never part of an n-gram
+_WORD = re.compile(r"\w+")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercases text and collapses runs of whitespace.
+    """
+    return _WHITESPACE.sub(" ", text.lower()).strip()
+
+def char_ngram_hashes(texts: List[str], n: int):
+    """
+    Hashes every character n-gram of every text (padded with spaces) in one vectorized pass.
+
+    Returns:
+        Tuple of (owners, hashes): the index of the text each n-gram came from
+        (ascending) and its 64-bit FNV-1a hash
+    """
+    count = len(texts)
+    encoded = [f" {text} ".encode() for text in texts]
+    lengths = np.fromiter((len(data) + 1 for data in encoded), dtype=np.int64, count=count)
+    data = np.frombuffer(b"\0".join(encoded) + b"\0", dtype=np.uint8).astype(np.uint64)
+    windows = len(data) - n + 1
+    if count == 0 or windows <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)
+    
+    h = np.full(windows, FNV_OFFSET ^ np.uint64(n), dtype=np.uint64)
+    for offset in range(n):
+        h ^= data[offset:offset + windows]
+        h *= FNV_PRIME
+    # Drop windows that span the separator between two texts
+    separators = np.concatenate(([0], np.cumsum(data == SEPARATOR)))
+    valid = separators[n:n + windows] == separators[:windows]
+    owners = np.repeat(np.arange(count, dtype=np.int64), lengths)[:windows]
+    return owners[valid], h[valid]
+
+class HashingNgramEmbedder:
+    """
+    Offline text embedder: hashed word and character n-gram TF-IDF.
+
+    Word unigrams/bigrams and character n-grams (within the normalized text,
+    padded with spaces) are hashed into dim buckets, weighted with sublinear
+    term frequency and an optional fitted IDF, and L2-normalized. Hashing is
+    deterministic across processes, so stored vectors stay comparable.
+    """
+    def __init__(self, dim=384, char_ngrams=(3, 5), word_ngrams=(1, 2), idf: Optional[np.ndarray] = None,
+                 chunk_size=4096):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+        self.word_ngrams = word_ngrams
+        self.idf = idf
+        self.chunk_size = chunk_size
+        self._word_hashes = {}
+
+    @property
+    def name(self) -> str:
+        """
+        Identifies the embedding space; changes whenever a different IDF is fitted.
+        """
+        name = f"ngram-tfidf-v1-{self.dim}"
+        if self.idf is not None:
+            name += "-" + hashlib.sha1(self.idf.astype(np.float32).tobytes()).hexdigest()[:8]
+        return name
+
+    @classmethod
+    def load(cls, path, dim=384):
+        """
+        Creates an embedder with the IDF weights saved at path, if the file exists.
+        """
+        idf = None
+        if os.path.exists(path):
+            try:
+                idf = np.load(path)
+                if idf.shape != (dim,):
+                    print(f"Ignoring IDF weights in {path}: expected {dim} buckets, found {idf.shape}")
+                    idf = None
+            except Exception as e:
+                print(f"Error loading IDF weights from {path}: {e}")
+        return cls(dim=dim, idf=idf)
+
+    def save(self, path):
+        """
+        Saves the fitted IDF weights to path (a .npy file).
+        """
+        if self.idf is None:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            np.save(f, self.idf)
+
+    def fit(self, texts: List[str]):
+        """
+        Fits smoothed IDF weights over the hashed buckets of the given corpus.
+        """
+        texts = list(texts)
+        document_frequency = np.zeros(self.dim, dtype=np.int64)
+        for start in range(0, len(texts), self.chunk_size):
+            counts = self._bucket_counts(texts[start:start + self.chunk_size])
+            document_frequency += np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        return self
+
+    def transform(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds texts into an L2-normalized float32 matrix with one row per text.
+        """
+        texts = list(texts)
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), self.chunk_size):
+            counts = self._bucket_counts(texts[start:start + self.chunk_size]).astype(np.float32)
+            weights = np.zeros_like(counts)
+            np.log(counts, out=weights, where=counts > 0)
+            weights[counts > 0] += 1  # sublinear tf: 1 + log(count)
+            if self.idf is not None:
+                weights *= self.idf
+            norms = np.linalg.norm(weights, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            embeddings[start:start + len(counts)] = weights / norms
+        return embeddings
+
+    def _bucket_counts(self, texts: List[str]) -> np.ndarray:
+        """
+        Counts hashed n-gram occurrences per text into an (len(texts), dim) matrix.
+        """
+        count = len(texts)
+        normalized = [normalize_text(text) for text in texts]
+        owners, hashes = [], []
+
+        for n in range(self.char_ngrams[0], self.char_ngrams[1] + 1):
+            ngram_owners, ngram_hashes = char_ngram_hashes(normalized, n)
+            owners.append(ngram_owners)
+            hashes.append(ngram_hashes)
+
+        # Word n-grams: cached CRC32 per word, combined numerically for bigrams
+        words_per_text = [_WORD.findall(text) for text in normalized]
+        word_counts = np.fromiter((len(words) for words in words_per_text), dtype=np.int64, count=count)
+        word_hashes = np.fromiter(
+            (self._word_hash(word) for words in words_per_text for word in words),
+            dtype=np.uint64,
+            count=int(word_counts.sum())
+        )
+        word_owners = np.repeat(np.arange(count, dtype=np.int64), word_counts)
+        if self.word_ngrams[0] <= 1 <= self.word_ngrams[1]:
+            owners.append(word_owners)
+            hashes.append(word_hashes * MIX_MULTIPLIER)
+        if self.word_ngrams[1] >= 2 and len(word_hashes) > 1:
+            same_text = word_owners[1:] == word_owners[:-1]
+            bigrams = (word_hashes[:-1] * FNV_PRIME) ^ word_hashes[1:]
+            owners.append(word_owners[1:][same_text])
+            hashes.append(bigrams[same_text] * MIX_MULTIPLIER)
+
+        if not hashes:
+            return np.zeros((count, self.dim), dtype=np.int64)
+        owners = np.concatenate(owners)
+        hashes = np.concatenate(hashes)
+        buckets = ((hashes ^ (hashes >> np.uint64(29))) % np.uint64(self.dim)).astype(np.int64)
+        return np.bincount(owners * self.dim + buckets, minlength=count * self.dim).reshape(count, self.dim)
+
+    def _word_hash(self, word: str) -> int:
+        value = self._word_hashes.get(word)
+        if value is None:
+            value = zlib.crc32(word.encode()) | (len(word) << 32)
+            if len(self._word_hashes) < 1_000_000:
+                self._word_hashes[word] = value
+        return value
@@ -1,149 +1,670 @@
 import chromadb
 import hashlib
 import json
-from typing import List, Optional
+import numpy as np
+import os
+from typing import List, Optional, Tuple
+from config import EMBEDDING_BACKEND, EMBEDDING_SNAPSHOT_DTYPE
+from embedding_snapshot import EmbeddingSnapshot
+from text_embedding import HashingNgramEmbedder
+
+EMBEDDING_BACKENDS = ("simple", "ngram", "ollama")
+EMBEDDING_SIZE = 384  # Standard embedding size
+EMBEDDING_CHUNK_SIZE = 4096  # Texts embedded per vectorized pass
+DEFAULT_MAX_BATCH_SIZE = 5461  # Chroma's SQLite-backed limit when the client cannot report one
+VECTOR_DB_PATH = "VectorDataBase"
+NGRAM_IDF_PATH = os.path.join(VECTOR_DB_PATH, "ngram_idf.npy")
+# Byte values of 'a'-'z' then '0'-'9', in embedding slot order
+FREQUENCY_BYTES = np.frombuffer(b"abcdefghijklmnopqrstuvwxyz0123456789", dtype=np.uint8).astype(np.intp)
+
+TAG_KEY_PREFIX = "tag:"  # Each tag is stored as a boolean metadata key, e.g. {"tag:python": True}
+
+def build_vector_text(question):
+    """Create the text representation of a question stored in the vector database"""
+    return f"Question: {question['question']} Solution: {question.get('solution', '')} Tags: {', '.join(question.get('tags', []))}"
+
+def build_vector_metadata(question):
+    """
+    Filterable fields of a question stored as Chroma metadata.
+    Accepts API payloads (question_type) as well as database rows (type).
+    """
+    metadata = {
+        "difficulty": question.get("difficulty") or "",
+        "type": question.get("question_type") or question.get("type") or "",
+        "language": (question.get("language") or "").lower(),
+        "image_required": bool(question.get("image_required"))
+    }
+    for tag in question.get("tags") or []:
+        metadata[TAG_KEY_PREFIX + tag] = True
+    return metadata
 
 class VectorDatabase:
     def __init__(self):
-        self.client = chromadb.PersistentClient(path="VectorDataBase")
+        if EMBEDDING_BACKEND not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unsupported EMBEDDING_BACKEND: {EMBEDDING_BACKEND} (expected one of {', '.join(EMBEDDING_BACKENDS)})")
+        self.client = chromadb.PersistentClient(path=VECTOR_DB_PATH)
         try:
             self.collection = self.client.create_collection("Questions")
         except Exception as e:
             print("Collection already exists, getting existing collection")
             self.collection = self.client.get_collection("Questions")
-        self.use_ollama = False  # Set to False to use simple embeddings
+        self.use_ollama = EMBEDDING_BACKEND == "ollama"
+        # Local embedder (not used as a fallback for Ollama: the vector spaces differ)
+        self.ngram_embedder = None
+        if EMBEDDING_BACKEND == "ngram":
+            self.ngram_embedder = HashingNgramEmbedder.load(NGRAM_IDF_PATH, dim=EMBEDDING_SIZE)
+        # Memory-mapped quantized copy of the embeddings for similarity scans
+        self.snapshot = None
+        if EMBEDDING_SNAPSHOT_DTYPE != "off":
+            self.snapshot = EmbeddingSnapshot(VECTOR_DB_PATH, dtype=EMBEDDING_SNAPSHOT_DTYPE)
+            self.snapshot.load()
+
+    @property
+    def embedding_model(self) -> str:
+        """
+        Name of the active embedding backend; part of every content hash so that
+        switching backends invalidates cached embeddings.
+        """
+        if self.use_ollama:
+            return "nomic-embed-text"
+        if self.ngram_embedder is not None:
+            return self.ngram_embedder.name
+        return "simple-v1"
+
+    def fit_local_embedder(self, texts: List[str]):
+        """
+        Fits the n-gram embedder's IDF weights on a corpus and saves them next to the collection.
+        Changes the embedding model name, so stored vectors are re-embedded on the next upsert.
+        """
+        if self.ngram_embedder is None:
+            return
+        self.ngram_embedder.fit(texts)
+        self.ngram_embedder.save(NGRAM_IDF_PATH)
+
+    def content_hash(self, text: str) -> str:
+        """
+        Hash identifying the embedded text (and the model that embedded it).
+        Stored as Chroma metadata so unchanged texts can skip re-embedding.
+        """
+        return hashlib.sha256(f"{self.embedding_model}\0{text}".encode()).hexdigest()
+
+    def _stored_metadatas(self, ids) -> dict:
+        """
+        Returns {id: metadata} for the ids that are already stored.
+        """
+        stored = {}
+        batch_size = self._max_batch_size()
+        for start in range(0, len(ids), batch_size):
+            existing = self.collection.get(ids=ids[start:start + batch_size], include=['metadatas'])
+            for doc_id, metadata in zip(existing["ids"], existing["metadatas"] or []):
+                stored[doc_id] = metadata or {}
+        return stored
+
+    @staticmethod
+    def _metadata_changes(metadata, stored):
+        """
+        Keys to write so the stored metadata matches metadata; tags that were
+        removed are set to None, which deletes them on update.
+        """
+        changes = {key: value for key, value in metadata.items() if stored.get(key) != value}
+        for key in stored:
+            if key.startswith(TAG_KEY_PREFIX) and key not in metadata:
+                changes[key] = None
+        return changes
+
+    def plan_upsert(self, ids, texts, metadatas=None):
+        """
+        Compares texts (by content hash) and metadata with what is stored.
+        
+        Returns:
+            {"embed": indices that are new or whose text changed,
+             "metadata": {index: changes} for stored metadata to patch after upserting,
+             "skipped": indices that are fully up to date}
+        """
+        ids = [str(id) for id in ids]
+        stored = self._stored_metadatas(ids)
+        plan = {"embed": [], "metadata": {}, "skipped": []}
+        for index, (doc_id, text) in enumerate(zip(ids, texts)):
+            current = stored.get(doc_id)
+            if current is None:
+                plan["embed"].append(index)
+                continue
+            # A matching hash implies the same model, so vectors written before the
+            # model was recorded only get it patched in
+            metadata = {"content_hash": self.content_hash(text), "embedding_model": self.embedding_model}
+            if metadatas is not None and metadatas[index] is not None:
+                metadata.update(metadatas[index])
+                changes = self._metadata_changes(metadata, current)
+            else:
+                changes = {key: value for key, value in metadata.items() if current.get(key) != value}
+            if current.get("content_hash") != metadata["content_hash"]:
+                plan["embed"].append(index)
+                # The upsert writes the new values; only removed tags remain
+                changes = {key: value for key, value in changes.items() if value is None}
+                if changes:
+                    plan["metadata"][index] = changes
+            elif changes:
+                plan["metadata"][index] = changes
+            else:
+                plan["skipped"].append(index)
+        return plan
+
+    def update_metadatas(self, ids, metadatas):
+        """
+        Patches stored metadata in chunks without touching embeddings.
+        Returns {"updated": [...], "failed": [{"ids": [...], "error": str}, ...]}.
+        """
+        ids = [str(id) for id in ids]
+        result = {"updated": [], "failed": []}
+        batch_size = self._max_batch_size()
+        for start in range(0, len(ids), batch_size):
+            chunk_ids = ids[start:start + batch_size]
+            try:
+                self.collection.update(ids=chunk_ids, metadatas=list(metadatas[start:start + batch_size]))
+                result["updated"].extend(chunk_ids)
+            except Exception as e:
+                print(f"Vector metadata update failed for {len(chunk_ids)} ids: {e}")
+                result["failed"].append({"ids": chunk_ids, "error": str(e)})
+        return result
+
+    @staticmethod
+    def build_where(tags=None, difficulties=None, languages=None, question_types=None):
+        """
+        Chroma where clause matching questions with ANY of the tags and one of the
+        given difficulties, languages and types (the filter_questions semantics).
+        Returns None when no filter is given.
+        """
+        clauses = []
+        if difficulties:
+            clauses.append({"difficulty": {"$in": list(difficulties)}})
+        if languages:
+            clauses.append({"language": {"$in": [language.lower() for language in languages]}})
+        if question_types:
+            clauses.append({"type": {"$in": list(question_types)}})
+        if tags:
+            tag_clauses = [{TAG_KEY_PREFIX + tag: True} for tag in tags]
+            clauses.append(tag_clauses[0] if len(tag_clauses) == 1 else {"$or": tag_clauses})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def stored_embedding_models(self, sample=100) -> set:
+        """
+        Embedding models recorded on a sample of stored vectors; None stands for
+        vectors written before the model was recorded.
+        """
+        page = self.collection.get(include=['metadatas'], limit=sample)
+        return {(metadata or {}).get("embedding_model") for metadata in page["metadatas"] or []}
+
+    def get_embeddings(self, ids) -> Tuple[List[str], np.ndarray]:
+        """
+        Reads the stored embeddings of the given ids (those that exist) in chunks.
+        Returns the found IDs and a float32 matrix with one row per ID.
+        """
+        ids = [str(id) for id in ids]
+        found, rows = [], []
+        batch_size = self._max_batch_size()
+        for start in range(0, len(ids), batch_size):
+            page = self.collection.get(ids=ids[start:start + batch_size], include=['embeddings'])
+            found.extend(page["ids"])
+            rows.extend(page["embeddings"])
+        return found, np.asarray(rows, dtype=np.float32)
+
+    def get_ids(self) -> List[str]:
+        """
+        Returns the IDs of every stored document, read page by page.
+        """
+        ids = []
+        batch_size = self._max_batch_size()
+        while True:
+            page = self.collection.get(include=[], limit=batch_size, offset=len(ids))
+            ids.extend(page["ids"])
+            if len(page["ids"]) < batch_size:
+                return ids
         
     def _generate_simple_embedding(self, text: str) -> List[float]:
         """
         Generate a simple embedding using character frequency and hash-based features.
-        This is a fallback when Ollama is not available.
-        """
-        # Convert text to lowercase for consistency
-        text = text.lower()
-        
-        # Create a simple embedding based on character frequencies and text features
-        embedding = [0.0] * 384  # Standard embedding size
-        
-        # Character frequency features
-        char_counts = {}
-        for char in text:
-            if char.isalnum():
-                char_counts[char] = char_counts.get(char, 0) + 1
-        
-        # Fill embedding with normalized character frequencies
-        for i, char in enumerate('abcdefghijklmnopqrstuvwxyz0123456789'):
-            if i < len(embedding):
-                embedding[i] = char_counts.get(char, 0) / len(text) if len(text) > 0 else 0
-        
-        # Add word-based features
-        words = text.split()
-        if len(words) > 0:
-            # Average word length
-            avg_word_len = sum(len(word) for word in words) / len(words)
-            if len(embedding) > 50:
-                embedding[50] = avg_word_len / 20  # Normalize
-            
-            # Number of words (normalized)
-            if len(embedding) > 51:
-                embedding[51] = min(len(words) / 100, 1.0)  # Cap at 100 words
+        Used by the legacy "simple" embedding backend.
+        """
+        return self._generate_simple_embeddings([text])[0].tolist()
+
+    def _generate_simple_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        Batched, NumPy-vectorized version of _generate_simple_embedding.
+        Produces the same features for every text and returns a float32 matrix
+        with one 384-dimensional row per text.
+        """
+        if len(texts) > EMBEDDING_CHUNK_SIZE:
+            # Bound the size of the per-chunk byte histograms
+            return np.vstack([
+                self._generate_simple_embeddings(texts[start:start + EMBEDDING_CHUNK_SIZE])
+                for start in range(0, len(texts), EMBEDDING_CHUNK_SIZE)
+            ])
+        
+        texts = [text.lower() for text in texts]
+        count = len(texts)
+        embeddings = np.zeros((count, EMBEDDING_SIZE), dtype=np.float32)
+        if count == 0:
+            return embeddings
         
-        # Use text hash for additional features
-        text_hash = hashlib.md5(text.encode()).hexdigest()
-        for i, char in enumerate(text_hash[:20]):  # Use first 20 hex chars
-            if 52 + i < len(embedding):
-                embedding[52 + i] = int(char, 16) / 15.0  # Normalize hex digit
+        encoded = [text.encode() for text in texts]
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.float32, count=count)
         
-        return embedding
-    def search(self , query , n_results=5):
+        # Byte histogram of every text at once. Multi-byte UTF-8 sequences never
+        # contain ASCII bytes, so ASCII letter/digit counts are exact.
+        byte_lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=count)
+        all_bytes = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.int64)
+        owners = np.repeat(np.arange(count, dtype=np.int64), byte_lengths)
+        histograms = np.bincount(owners * 256 + all_bytes, minlength=count * 256).reshape(count, 256)
+        
+        # Character frequency features (normalized by character length)
+        safe_lengths = np.where(lengths > 0, lengths, 1.0)
+        embeddings[:, :len(FREQUENCY_BYTES)] = histograms[:, FREQUENCY_BYTES] / safe_lengths[:, None]
+        
+        # Word-based features: average word length and number of words
+        word_counts = np.zeros(count, dtype=np.float32)
+        word_chars = np.zeros(count, dtype=np.float32)
+        for index, text in enumerate(texts):
+            words = text.split()
+            word_counts[index] = len(words)
+            word_chars[index] = sum(map(len, words))
+        has_words = word_counts > 0
+        embeddings[has_words, 50] = word_chars[has_words] / word_counts[has_words] / 20
+        embeddings[has_words, 51] = np.minimum(word_counts[has_words] / 100, 1.0)
+        
+        # Use text hash for additional features: first 20 hex digits of the MD5
+        digests = np.frombuffer(b"".join(hashlib.md5(data).digest() for data in encoded), dtype=np.uint8)
+        digests = digests.reshape(count, 16)[:, :10]
+        nibbles = np.stack((digests >> 4, digests & 0x0F), axis=2).reshape(count, 20)
+        embeddings[:, 52:72] = nibbles / 15.0
+        
+        return embeddings
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        """
+        Generates embeddings for a batch of texts in one pass.
+        Returns a float32 matrix with one row per text.
+        
+        Errors from Ollama are raised rather than falling back to a local
+        embedder: its vectors live in a different space (and width), and would
+        be stored under the Ollama content hash, so nothing would re-embed them.
+        """
+        texts = list(texts)
+        if self.use_ollama:
+            if not texts:
+                return np.zeros((0, 0), dtype=np.float32)
+            import ollama
+            response = ollama.embed(model='nomic-embed-text', input=texts)
+            return np.asarray(response['embeddings'], dtype=np.float32)
+        if self.ngram_embedder is not None:
+            return self.ngram_embedder.transform(texts)
+        return self._generate_simple_embeddings(texts)
+
+    def search(self , query , n_results=5, where=None):
         """
         Searches for similar documents based on the query text.
         Returns a list of IDs of similar documents.
         """
+        return [doc_id for doc_id, _ in self.search_with_distances(query, n_results=n_results, where=where)]
+
+    def search_with_distances(self, query, n_results=5, where=None):
+        """
+        Searches for similar documents based on the query text, optionally
+        restricted inside the index by a metadata where clause (see build_where).
+        Returns (id, distance) tuples, nearest first.
+        """
         query_embedding = self._generate_embedding(query)
         
         # Query the collection for similar documents
         query_result = self.collection.query(
             query_embeddings=[query_embedding],
             n_results=n_results,
+            where=where
         )
-        print(self.collection.get())
-        print(query_result)
-        # Extract results
-        distances = query_result["distances"][0]
-        ids = query_result["ids"][0]
+        return list(zip(query_result["ids"][0], query_result["distances"][0]))
+    def nearest_neighbours(self, texts, k=5, max_distance=None, exclude_ids=None, where=None, embeddings=None):
+        """
+        Finds the k nearest stored documents for each text with a single batched
+        embedding pass and collection query.
         
-        # Return IDs of similar documents
-        return ids[:n_results]
+        Args:
+            texts: Query texts (ignored when embeddings are given)
+            k: Neighbours returned per text
+            max_distance: Drop neighbours farther than this
+            exclude_ids: Optional ID per text to leave out of its own results (e.g. itself)
+            where: Optional metadata filter (see build_where)
+            embeddings: Precomputed query embeddings, one row per query
+        
+        Returns:
+            One list of (id, distance) tuples per text, nearest first
+        """
+        if embeddings is None:
+            texts = list(texts)
+            embeddings = self.embed_many(texts) if texts else []
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        count = len(embeddings)
+        if count == 0:
+            return []
+        stored = self.collection.count()
+        if stored == 0:
+            return [[] for _ in range(count)]
+        exclude_ids = [str(id) if id is not None else None for id in exclude_ids] if exclude_ids else [None] * count
+        # One extra result so excluding the query itself still leaves k
+        n_results = min(k + 1, stored)
+        query_result = self.collection.query(
+            query_embeddings=embeddings.tolist(),
+            n_results=n_results,
+            where=where
+        )
+        neighbours = []
+        for exclude_id, ids, distances in zip(exclude_ids, query_result["ids"], query_result["distances"]):
+            matches = [
+                (doc_id, float(distance)) for doc_id, distance in zip(ids, distances)
+                if doc_id != exclude_id and (max_distance is None or distance <= max_distance)
+            ]
+            neighbours.append(matches[:k])
+        return neighbours
+
     def _generate_embedding(self, text: str) -> List[float]:
         """
-        Generates an embedding for the given text.
-        Falls back to simple embedding if Ollama is not available.
+        Generates an embedding for the given text with the configured backend.
         """
-        if self.use_ollama:
+        return self.embed_many([text])[0].tolist()
+
+    def insert(self, text, id, metadata=None):
+        """
+        Generates an embedding for the text and inserts it into the database,
+        along with the question's filterable metadata.
+        """
+        self.upsert_many([id], [text], metadatas=[metadata])
+    def _max_batch_size(self) -> int:
+        """
+        Largest number of records Chroma accepts in one add/upsert/delete call.
+        """
+        try:
+            if hasattr(self.client, "get_max_batch_size"):
+                return int(self.client.get_max_batch_size())
+            return int(self.client.max_batch_size)
+        except Exception:
+            return DEFAULT_MAX_BATCH_SIZE
+
+    def upsert_many(self, ids, texts, skip_unchanged=True, embeddings=None, metadatas=None):
+        """
+        Embeds all texts in one pass and upserts them in chunks of Chroma's maximum batch size.
+        With skip_unchanged, ids whose stored content hash matches their text are
+        not re-embedded; if only their metadata changed it is patched in place.
+        Precomputed embeddings (one row per text) may be passed to skip embedding.
+        metadatas holds each question's filterable fields (see build_vector_metadata).
+        A failing chunk does not stop the others.
+        Returns {"upserted": [...], "metadata_updated": [...], "skipped": [...],
+                 "failed": [{"ids": [...], "error": str}, ...]}.
+        """
+        ids = [str(id) for id in ids]
+        texts = list(texts)
+        metadatas = list(metadatas) if metadatas is not None else [None] * len(ids)
+        result = {"upserted": [], "metadata_updated": [], "skipped": [], "failed": []}
+        if not ids:
+            return result
+        
+        patches = {}
+        if skip_unchanged:
+            plan = self.plan_upsert(ids, texts, metadatas)
+            result["skipped"] = [ids[index] for index in plan["skipped"]]
+            patches = plan["metadata"]
+            keep = plan["embed"]
+            embedding = set(keep)
+            metadata_only = [index for index in patches if index not in embedding]
+            if metadata_only:
+                updated = self.update_metadatas([ids[index] for index in metadata_only], [patches[index] for index in metadata_only])
+                result["metadata_updated"] = updated["updated"]
+                result["failed"].extend(updated["failed"])
+            patches = {index: patches[index] for index in keep if index in patches}
+            if not keep:
+                return result
+            if embeddings is not None:
+                embeddings = np.asarray(embeddings, dtype=np.float32)[keep]
+            patches = {position: patches[index] for position, index in enumerate(keep) if index in patches}
+            ids = [ids[index] for index in keep]
+            texts = [texts[index] for index in keep]
+            metadatas = [metadatas[index] for index in keep]
+        
+        if embeddings is None:
             try:
-                import ollama
-                response = ollama.embed(model='nomic-embed-text', input=text)
-                return response['embeddings'][0]
+                embeddings = self.embed_many(texts)
             except Exception as e:
-                print(f"Ollama embedding failed: {e}")
-                print("Falling back to simple embedding")
-                return self._generate_simple_embedding(text)
-        else:
-            return self._generate_simple_embedding(text)
+                print(f"Embedding failed for {len(ids)} ids: {e}")
+                result["failed"].append({"ids": ids, "error": str(e)})
+                return result
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        full_metadatas = [
+            {"content_hash": self.content_hash(text), "embedding_model": self.embedding_model, **(metadata or {})}
+            for text, metadata in zip(texts, metadatas)
+        ]
+        batch_size = self._max_batch_size()
+        for start in range(0, len(ids), batch_size):
+            chunk_ids = ids[start:start + batch_size]
+            try:
+                self.collection.upsert(
+                    ids=chunk_ids,
+                    embeddings=embeddings[start:start + batch_size].tolist(),
+                    documents=texts[start:start + batch_size],
+                    metadatas=full_metadatas[start:start + batch_size]
+                )
+                result["upserted"].extend(chunk_ids)
+                self._update_snapshot(ids=chunk_ids, embeddings=embeddings[start:start + batch_size])
+            except Exception as e:
+                print(f"Vector upsert failed for {len(chunk_ids)} ids: {e}")
+                result["failed"].append({"ids": chunk_ids, "error": str(e)})
+        
+        # Upserts merge metadata, so tags removed from re-embedded questions are deleted explicitly
+        upserted = set(result["upserted"])
+        stale = [position for position in patches if ids[position] in upserted]
+        if stale:
+            self.update_metadatas([ids[position] for position in stale], [patches[position] for position in stale])
+        return result
+
+    def delete_many(self, ids):
+        """
+        Deletes ids in chunks of Chroma's maximum batch size.
+        A failing chunk does not stop the others.
+        Returns {"deleted": [ids...], "failed": [{"ids": [...], "error": str}, ...]}.
+        """
+        ids = [str(id) for id in ids]
+        result = {"deleted": [], "failed": []}
+        batch_size = self._max_batch_size()
+        for start in range(0, len(ids), batch_size):
+            chunk_ids = ids[start:start + batch_size]
+            try:
+                self.collection.delete(ids=chunk_ids)
+                result["deleted"].extend(chunk_ids)
+                self._update_snapshot(deleted_ids=chunk_ids)
+            except Exception as e:
+                print(f"Vector delete failed for {len(chunk_ids)} ids: {e}")
+                result["failed"].append({"ids": chunk_ids, "error": str(e)})
+        return result
+
+    def update_question(self, id, text, metadata=None):
+        """
+        Updates the text (and metadata) for a given ID.
+        Skips embedding when the stored content hash shows the text is unchanged,
+        and skips the write entirely when the metadata is unchanged too.
+        Returns True if the vector was rewritten.
+        """
+        result = self.upsert_many([id], [text], metadatas=[metadata])
+        return bool(result["upserted"])
+    def _update_snapshot(self, ids=(), embeddings=(), deleted_ids=()):
+        """
+        Applies a write to the embedding snapshot (a no-op until one has been
+        exported). Failures invalidate it; the next scan re-exports it from the collection.
+        """
+        if self.snapshot is None:
+            return
+        try:
+            if len(ids):
+                self.snapshot.upsert(ids, np.asarray(embeddings, dtype=np.float32))
+            if len(deleted_ids):
+                self.snapshot.delete(deleted_ids)
+        except Exception as e:
+            print(f"Embedding snapshot update failed: {e}")
+            try:
+                self.snapshot.invalidate()
+            except Exception as invalidate_error:
+                print(f"Embedding snapshot invalidation failed: {invalidate_error}")
 
-    def insert(self, text, id):
+    def export_snapshot(self, batch_size=None):
         """
-        Generates an embedding for the text and inserts it into the database.
+        Writes every stored embedding to the quantized snapshot, reading the
+        collection page by page instead of as one list of floats.
         """
-        embedding_vector = self._generate_embedding(text=text)
+        if self.snapshot is None:
+            return None
+        count = self.collection.count()
+        batch_size = batch_size or self._max_batch_size()
         
-        # The upsert method expects lists for ids, embeddings, and documents.
-        self.collection.upsert(
-            ids=[str(id)],
-            embeddings=[embedding_vector],
-            documents=[text]
-        )
-    def update_question(self, id, text):
+        def batches():
+            for offset in range(0, count, batch_size):
+                page = self.collection.get(include=['embeddings'], limit=batch_size, offset=offset)
+                if not page["ids"]:
+                    break
+                yield page["ids"], np.asarray(page["embeddings"], dtype=np.float32)
+        
+        if count == 0:
+            self.snapshot.rebuild([], 0, EMBEDDING_SIZE)
+            return self.snapshot
+        # The snapshot needs the embedding width before the first page is written
+        first_page = self.collection.get(include=['embeddings'], limit=1)
+        dim = len(first_page["embeddings"][0])
+        self.snapshot.rebuild(batches(), count, dim)
+        return self.snapshot
+
+    def _fresh_snapshot(self):
         """
-        Updates the text for a given ID by generating a new embedding.
+        Returns the snapshot once it matches the collection, re-exporting it if
+        it is missing or its row count disagrees. None if snapshots are disabled.
+        """
+        if self.snapshot is None:
+            return None
+        try:
+            self.snapshot.reload_if_changed()
+            if not self.snapshot.loaded or self.snapshot.count != self.collection.count():
+                self.export_snapshot()
+            return self.snapshot
+        except Exception as e:
+            print(f"Embedding snapshot unavailable, reading embeddings from the collection: {e}")
+            return None
+
+    def _load_embedding_matrix(self) -> Tuple[List[str], np.ndarray]:
+        """
+        Loads every stored embedding in one call.
+        Returns the document IDs and a float32 matrix with one row per document.
+        """
+        all_data = self.collection.get(include=['embeddings'])
+        ids = all_data["ids"]
+        if not ids:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        return ids, np.asarray(all_data["embeddings"], dtype=np.float32)
+
+    def find_redundant_pairs(self, threshold, n=2, memory_budget_mb=256):
         """
-        embedding_vector = self._generate_embedding(text=text)
+        Finds pairs of documents closer than threshold with blocked matrix products.
         
-        # The upsert method expects lists for ids, embeddings, and documents.
-        self.collection.upsert(
-            ids=[id],
-            embeddings=[embedding_vector],
-            documents=[text]
+        Embeddings are read from the memory-mapped snapshot when available (or
+        loaded from the collection once) and compared against themselves in row
+        blocks sized so each distance tile and its argpartition index tile fit
+        in memory_budget_mb; quantized rows are dequantized one column chunk at
+        a time. Distances use the collection's distance function (l2, cosine or
+        ip), so threshold means the same as for collection.query. As with a
+        query for n results, each document keeps at most its n - 1 nearest
+        neighbours (itself excluded).
+        
+        Returns a list of (id_a, id_b, distance) tuples sorted by distance.
+        """
+        snapshot = self._fresh_snapshot()
+        if snapshot is not None:
+            # Writers in any process move rows (delete) and swap the memmap
+            # (grow), so the ids and rows must not change until the scan is done
+            with snapshot.locked(shared=True):
+                return self._scan_redundant_pairs(list(snapshot.ids), snapshot.rows, threshold, n, memory_budget_mb)
+        ids, matrix = self._load_embedding_matrix()
+        return self._scan_redundant_pairs(ids, lambda start, stop: matrix[start:stop], threshold, n, memory_budget_mb)
+
+    def _scan_redundant_pairs(self, ids, read_rows, threshold, n, memory_budget_mb):
+        """
+        Blocked all-pairs scan behind find_redundant_pairs; read_rows(start, stop)
+        returns float32 embeddings aligned with ids.
+        """
+        count = len(ids)
+        if count < 2:
+            return []
+        
+        space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+        
+        def rows(start, stop):
+            block = read_rows(start, stop)
+            if space == "cosine":
+                norms = np.linalg.norm(block, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                block = block / norms
+            return block
+        
+        k = min(max(n - 1, 1), count - 1)
+        # Each block holds a float32 distances tile and the int64 index tile argpartition returns
+        block_size = max(1, int(memory_budget_mb * 1024 * 1024 // (count * (4 + 8))))
+        squared_norms = np.concatenate([
+            np.einsum("ij,ij->i", chunk, chunk)
+            for chunk in (rows(start, min(start + block_size, count)) for start in range(0, count, block_size))
+        ])
+        
+        pairs = {}
+        for start in range(0, count, block_size):
+            stop = min(start + block_size, count)
+            block = rows(start, stop)
+            # Distances are computed in place so the tile is the only float32 allocation
+            distances = np.empty((stop - start, count), dtype=np.float32)
+            for column in range(0, count, block_size):
+                column_stop = min(column + block_size, count)
+                np.matmul(block, rows(column, column_stop).T, out=distances[:, column:column_stop])
+            if space == "l2":
+                distances *= -2
+                distances += squared_norms[start:stop, None]
+                distances += squared_norms[None, :]
+                np.maximum(distances, 0, out=distances)
+            else:
+                distances *= -1
+                distances += 1
+            rows_index = np.arange(stop - start)
+            distances[rows_index, rows_index + start] = np.inf  # skip self-match
+            
+            # Copy the k columns out so the full index tile is freed straight away
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k].copy()
+            nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+            del distances  # Freed before the next block's tile is allocated
+            for row, col in zip(*np.nonzero(nearest_distances < threshold)):
+                i, j = start + row, int(nearest[row, col])
+                key = (min(i, j), max(i, j))
+                distance = float(nearest_distances[row, col])
+                if key not in pairs or distance < pairs[key]:
+                    pairs[key] = distance
+        
+        return sorted(
+            ((ids[i], ids[j], distance) for (i, j), distance in pairs.items()),
+            key=lambda pair: pair[2]
         )
+
     def check_redundant_data(self, threshold, n=2):
         """
-        Finds redundant documents by querying for nearest neighbors in ChromaDB.
-        Returns IDs of documents whose nearest neighbor's distance is below the threshold.
+        Finds redundant documents by comparing all embeddings against each other.
+        Returns IDs of documents with a neighbour closer than the threshold.
         """
-        all_data = self.collection.get()
-        ids = all_data["ids"]
         redundant_ids = set()
-
-        for i, doc_id in enumerate(ids):
-            # Get the embedding for the current document
-            current_doc = self.collection.get(ids=[doc_id], include=['embeddings'])
-            current_embedding = current_doc["embeddings"][0]  # Extract the actual embedding vector
-            
-            query_result = self.collection.query(
-                query_embeddings=[current_embedding],  # Pass as a list containing the embedding
-                n_results=n,
-            )
-            # Skip self-match (distance 0), check next closest
-            distances = query_result["distances"][0]
-            print(f"Distances for {doc_id}: {distances}")
-            neighbor_ids = query_result["ids"][0]
-            for dist, neighbor_id in zip(distances[1:], neighbor_ids[1:]):
-                if dist < threshold:
-                    redundant_ids.add(doc_id)
-                    redundant_ids.add(neighbor_id)
+        for id_a, id_b, _ in self.find_redundant_pairs(threshold=threshold, n=n):
+            redundant_ids.add(id_a)
+            redundant_ids.add(id_b)
         return list(redundant_ids)
     def delete_id(self , id):
         self.collection.delete(ids = str(id))
+        self._update_snapshot(deleted_ids=[str(id)])
     
     def find_similar_data(self, text, threshold=0.8, n_results=5):
         """
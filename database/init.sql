@@ -31,6 +31,11 @@ CREATE INDEX IF NOT EXISTS idx_questions_created_at ON questions(created_at);
 CREATE INDEX IF NOT EXISTS idx_tags_question_id ON tags(question_id);
 CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags(tag);
 
+-- Composite indexes for exact filters ordered by newest question first
+CREATE INDEX IF NOT EXISTS idx_questions_difficulty_type_id ON questions(difficulty, type, question_id DESC);
+CREATE INDEX IF NOT EXISTS idx_questions_type_id ON questions(type, question_id DESC);
+CREATE INDEX IF NOT EXISTS idx_questions_lower_language_id ON questions(lower(language), question_id DESC);
+
 -- Create a function to update the updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -47,6 +52,290 @@ CREATE TRIGGER update_questions_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Full-text search: weighted tsvector over question (A), tags (B), solution (C)
+-- and difficulty/type (D), kept current by triggers on questions and tags
+ALTER TABLE questions ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION build_question_search_vector(
+    p_question_id INTEGER, p_question TEXT, p_solution TEXT, p_difficulty TEXT, p_type TEXT
+)
+RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('english', coalesce(p_question, '')), 'A') ||
+           setweight(to_tsvector('english', coalesce(
+               (SELECT string_agg(tag, ' ') FROM tags WHERE question_id = p_question_id), '')), 'B') ||
+           setweight(to_tsvector('english', coalesce(p_solution, '')), 'C') ||
+           setweight(to_tsvector('simple', coalesce(p_difficulty, '') || ' ' || coalesce(p_type, '')), 'D');
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION update_question_search_vector()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector = build_question_search_vector(
+        NEW.question_id, NEW.question, NEW.solution, NEW.difficulty, NEW.type
+    );
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_questions_search_vector ON questions;
+CREATE TRIGGER update_questions_search_vector
+    BEFORE INSERT OR UPDATE OF question, solution, difficulty, type ON questions
+    FOR EACH ROW
+    EXECUTE FUNCTION update_question_search_vector();
+
+CREATE INDEX IF NOT EXISTS idx_questions_search_vector ON questions USING GIN(search_vector);
+
+-- Interned tags: every distinct tag name gets an integer id, and questions carry
+-- their tags as an ordered int[] so read paths and tag filters avoid joining tags.
+-- The tags table stays the write path; tag_ids is derived from it by trigger.
+CREATE TABLE IF NOT EXISTS tag_dictionary (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE
+);
+
+ALTER TABLE questions ADD COLUMN IF NOT EXISTS tag_ids INTEGER[] NOT NULL DEFAULT '{}';
+CREATE INDEX IF NOT EXISTS idx_questions_tag_ids ON questions USING GIN(tag_ids);
+
+CREATE OR REPLACE FUNCTION build_question_tag_ids(p_question_id INTEGER)
+RETURNS INTEGER[] AS $$
+    SELECT coalesce(array_agg(d.id ORDER BY t.id), '{}')
+    FROM tags t
+    JOIN tag_dictionary d ON d.name = t.tag
+    WHERE t.question_id = p_question_id;
+$$ LANGUAGE sql STABLE;
+
+-- Tag changes refresh the parent questions' tag_ids and search_vector once per
+-- statement (not once per tag row)
+CREATE OR REPLACE FUNCTION refresh_question_tag_columns()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO tag_dictionary (name)
+        SELECT DISTINCT tag FROM new_tags
+        ON CONFLICT (name) DO NOTHING;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        UPDATE questions q
+        SET tag_ids = build_question_tag_ids(q.question_id),
+            search_vector = build_question_search_vector(q.question_id, q.question, q.solution, q.difficulty, q.type)
+        WHERE q.question_id IN (SELECT question_id FROM new_tags);
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE questions q
+        SET tag_ids = build_question_tag_ids(q.question_id),
+            search_vector = build_question_search_vector(q.question_id, q.question, q.solution, q.difficulty, q.type)
+        WHERE q.question_id IN (SELECT question_id FROM old_tags);
+    ELSE
+        UPDATE questions q
+        SET tag_ids = build_question_tag_ids(q.question_id),
+            search_vector = build_question_search_vector(q.question_id, q.question, q.solution, q.difficulty, q.type)
+        WHERE q.question_id IN (SELECT question_id FROM new_tags UNION SELECT question_id FROM old_tags);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS refresh_tag_columns_on_tag_insert ON tags;
+CREATE TRIGGER refresh_tag_columns_on_tag_insert
+    AFTER INSERT ON tags
+    REFERENCING NEW TABLE AS new_tags
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION refresh_question_tag_columns();
+
+DROP TRIGGER IF EXISTS refresh_tag_columns_on_tag_update ON tags;
+CREATE TRIGGER refresh_tag_columns_on_tag_update
+    AFTER UPDATE ON tags
+    REFERENCING OLD TABLE AS old_tags NEW TABLE AS new_tags
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION refresh_question_tag_columns();
+
+DROP TRIGGER IF EXISTS refresh_tag_columns_on_tag_delete ON tags;
+CREATE TRIGGER refresh_tag_columns_on_tag_delete
+    AFTER DELETE ON tags
+    REFERENCING OLD TABLE AS old_tags
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION refresh_question_tag_columns();
+
+-- Trigram indexes for typo-tolerant (fuzzy) search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_questions_question_trgm ON questions USING GIN(question gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_tags_tag_trgm ON tags USING GIN(tag gin_trgm_ops);
+
+-- Statistics counters maintained by statement-level triggers so /get-stats is one read.
+-- dimension is one of 'total', 'difficulty', 'type', 'language' or 'tag'. The
+-- ('version', '') row is bumped by every write and stamps cached redundancy reports.
+CREATE TABLE IF NOT EXISTS question_stats (
+    dimension VARCHAR(20) NOT NULL,
+    value VARCHAR(100) NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, value)
+);
+
+CREATE OR REPLACE FUNCTION bump_question_bank_version()
+RETURNS VOID AS $$
+    INSERT INTO question_stats (dimension, value, count) VALUES ('version', '', 1)
+    ON CONFLICT (dimension, value) DO UPDATE SET count = question_stats.count + 1;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION maintain_question_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO question_stats (dimension, value, count)
+        SELECT d.dimension, d.value, COUNT(*)
+        FROM new_rows r,
+             LATERAL (VALUES ('total', ''), ('difficulty', r.difficulty), ('type', r.type), ('language', r.language)) AS d(dimension, value)
+        WHERE d.value IS NOT NULL
+        GROUP BY d.dimension, d.value
+        ON CONFLICT (dimension, value) DO UPDATE SET count = question_stats.count + EXCLUDED.count;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO question_stats (dimension, value, count)
+        SELECT d.dimension, d.value, -COUNT(*)
+        FROM old_rows r,
+             LATERAL (VALUES ('total', ''), ('difficulty', r.difficulty), ('type', r.type), ('language', r.language)) AS d(dimension, value)
+        WHERE d.value IS NOT NULL
+        GROUP BY d.dimension, d.value
+        ON CONFLICT (dimension, value) DO UPDATE SET count = question_stats.count + EXCLUDED.count;
+    ELSE
+        -- Only rows whose counted columns changed produce a delta
+        INSERT INTO question_stats (dimension, value, count)
+        SELECT d.dimension, d.value, SUM(r.delta)
+        FROM (
+            SELECT n.difficulty, n.type, n.language, 1 AS delta
+            FROM new_rows n JOIN old_rows o ON o.question_id = n.question_id
+            WHERE (n.difficulty, n.type, n.language) IS DISTINCT FROM (o.difficulty, o.type, o.language)
+            UNION ALL
+            SELECT o.difficulty, o.type, o.language, -1 AS delta
+            FROM old_rows o JOIN new_rows n ON n.question_id = o.question_id
+            WHERE (n.difficulty, n.type, n.language) IS DISTINCT FROM (o.difficulty, o.type, o.language)
+        ) r,
+             LATERAL (VALUES ('difficulty', r.difficulty), ('type', r.type), ('language', r.language)) AS d(dimension, value)
+        WHERE d.value IS NOT NULL
+        GROUP BY d.dimension, d.value
+        HAVING SUM(r.delta) <> 0
+        ON CONFLICT (dimension, value) DO UPDATE SET count = question_stats.count + EXCLUDED.count;
+    END IF;
+    PERFORM bump_question_bank_version();
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION maintain_tag_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO question_stats (dimension, value, count)
+        SELECT 'tag', r.tag, COUNT(*) FROM new_rows r GROUP BY r.tag
+        ON CONFLICT (dimension, value) DO UPDATE SET count = question_stats.count + EXCLUDED.count;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        INSERT INTO question_stats (dimension, value, count)
+        SELECT 'tag', r.tag, -COUNT(*) FROM old_rows r GROUP BY r.tag
+        ON CONFLICT (dimension, value) DO UPDATE SET count = question_stats.count + EXCLUDED.count;
+    END IF;
+    PERFORM bump_question_bank_version();
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS question_stats_on_insert ON questions;
+CREATE TRIGGER question_stats_on_insert
+    AFTER INSERT ON questions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_question_stats();
+
+DROP TRIGGER IF EXISTS question_stats_on_update ON questions;
+CREATE TRIGGER question_stats_on_update
+    AFTER UPDATE ON questions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_question_stats();
+
+DROP TRIGGER IF EXISTS question_stats_on_delete ON questions;
+CREATE TRIGGER question_stats_on_delete
+    AFTER DELETE ON questions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_question_stats();
+
+DROP TRIGGER IF EXISTS tag_stats_on_insert ON tags;
+CREATE TRIGGER tag_stats_on_insert
+    AFTER INSERT ON tags
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tag_stats();
+
+DROP TRIGGER IF EXISTS tag_stats_on_update ON tags;
+CREATE TRIGGER tag_stats_on_update
+    AFTER UPDATE ON tags
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tag_stats();
+
+DROP TRIGGER IF EXISTS tag_stats_on_delete ON tags;
+CREATE TRIGGER tag_stats_on_delete
+    AFTER DELETE ON tags
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_tag_stats();
+
+-- Recompute every counter from scratch (used to initialise or repair question_stats)
+CREATE OR REPLACE FUNCTION rebuild_question_stats()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE questions, tags IN SHARE MODE;
+    -- The version counter must never go backwards, so it survives rebuilds
+    DELETE FROM question_stats WHERE dimension <> 'version';
+    INSERT INTO question_stats (dimension, value, count)
+    SELECT 'total', '', COUNT(*) FROM questions
+    UNION ALL
+    SELECT 'difficulty', difficulty, COUNT(*) FROM questions GROUP BY difficulty
+    UNION ALL
+    SELECT 'type', type, COUNT(*) FROM questions GROUP BY type
+    UNION ALL
+    SELECT 'language', language, COUNT(*) FROM questions WHERE language IS NOT NULL GROUP BY language
+    UNION ALL
+    SELECT 'tag', tag, COUNT(*) FROM tags GROUP BY tag;
+END;
+$$ language 'plpgsql';
+
+-- Persisted redundancy reports, reused while the bank version is unchanged
+CREATE TABLE IF NOT EXISTS redundancy_reports (
+    id SERIAL PRIMARY KEY,
+    method VARCHAR(20) NOT NULL DEFAULT 'vector',
+    threshold DOUBLE PRECISION NOT NULL,
+    n INTEGER NOT NULL,
+    bank_version BIGINT NOT NULL,
+    report JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Reports are keyed by detection method (vector or minhash) as well as settings
+ALTER TABLE redundancy_reports ADD COLUMN IF NOT EXISTS method VARCHAR(20) NOT NULL DEFAULT 'vector';
+ALTER TABLE redundancy_reports DROP CONSTRAINT IF EXISTS redundancy_reports_threshold_n_bank_version_key;
+
+-- Vector reports are only valid for the embedding space they were computed in
+ALTER TABLE redundancy_reports ADD COLUMN IF NOT EXISTS embedding_model VARCHAR(100) NOT NULL DEFAULT '';
+DROP INDEX IF EXISTS idx_redundancy_reports_settings;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_redundancy_reports_settings_model
+    ON redundancy_reports (method, embedding_model, threshold, n, bank_version);
+
+-- Near-duplicate graph maintained on every write: one edge per pair of
+-- questions (smaller id first) found within the duplicate distance threshold.
+-- Edges of a question are replaced when it is edited and cascade on delete.
+CREATE TABLE IF NOT EXISTS question_duplicates (
+    question_id INTEGER NOT NULL REFERENCES questions(question_id) ON DELETE CASCADE,
+    duplicate_id INTEGER NOT NULL REFERENCES questions(question_id) ON DELETE CASCADE,
+    distance DOUBLE PRECISION NOT NULL,
+    detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (question_id, duplicate_id),
+    CHECK (question_id < duplicate_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_question_duplicates_duplicate_id ON question_duplicates (duplicate_id);
+CREATE INDEX IF NOT EXISTS idx_question_duplicates_distance ON question_duplicates (distance);
+
 -- Insert some sample data for testing (optional)
 INSERT INTO questions (question, difficulty, language, image_required, type, solution) VALUES
 ('What is the capital of India?', 'Easy', 'English', FALSE, 'MCQ', 'New Delhi'),
@@ -67,6 +356,23 @@ INSERT INTO tags (question_id, tag) VALUES
 (3, 'naval equipment')
 ON CONFLICT DO NOTHING;
 
+-- Backfill search vectors for rows created before the column existed
+UPDATE questions
+SET search_vector = build_question_search_vector(question_id, question, solution, difficulty, type)
+WHERE search_vector IS NULL;
+
+-- Backfill the tag dictionary and tag_ids for tags created before they existed
+INSERT INTO tag_dictionary (name)
+SELECT DISTINCT tag FROM tags
+ON CONFLICT (name) DO NOTHING;
+
+UPDATE questions q
+SET tag_ids = build_question_tag_ids(q.question_id)
+WHERE q.tag_ids IS DISTINCT FROM build_question_tag_ids(q.question_id);
+
+-- Initialise statistics counters from the current contents
+SELECT rebuild_question_stats();
+
 -- Grant necessary permissions
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO postgres;
 GRANT ALL PRIVILEGES ON ALL SEQUENCES IN SCHEMA public TO postgres;
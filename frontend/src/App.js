@@ -94,6 +94,30 @@ function App() {
     }
   };
 
+  const handleAddQuestions = async (questionsData) => {
+    try {
+      const result = await questionService.addQuestions(questionsData);
+      if (result.error) {
+        throw new Error(result.error);
+      }
+      // Reload all questions to get the latest data from the database
+      await loadQuestions();
+      // Reapply filters if any are active
+      if (isFiltering) {
+        await handleFilterChange(activeFilters);
+      }
+      if (result.failed > 0) {
+        toast.warning(`Added ${result.inserted} question(s), ${result.failed} failed`);
+      } else {
+        toast.success(`Added ${result.inserted} question(s) successfully!`);
+      }
+      return result;
+    } catch (error) {
+      toast.error('Failed to add questions: ' + error.message);
+      throw error;
+    }
+  };
+
   const handleDeleteQuestion = async (questionId) => {
     try {
       await questionService.deleteQuestion(questionId);
@@ -213,6 +237,7 @@ function App() {
             <GeneratedQuestions 
               questions={generatedQuestions}
               onAddQuestion={handleAddQuestion}
+              onAddQuestions={handleAddQuestions}
               onClearGenerated={() => setGeneratedQuestions([])}
             />
           </div>
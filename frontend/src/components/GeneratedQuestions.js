@@ -2,30 +2,50 @@ import React, { useState } from 'react';
 import { Plus, Trash2, Eye, EyeOff } from 'lucide-react';
 import { toast } from 'react-toastify';
 
-const GeneratedQuestions = ({ questions, onAddQuestion, onClearGenerated }) => {
+const GeneratedQuestions = ({ questions, onAddQuestion, onAddQuestions, onClearGenerated }) => {
   const [addedQuestions, setAddedQuestions] = useState(new Set());
   const [showSolutions, setShowSolutions] = useState({});
 
+  // Convert the question to the expected format
+  const toQuestionData = (question) => ({
+    question: question.question,
+    question_type: question.question_type || question.type || 'MCQ',
+    solution: question.solution || question.answer || '',
+    difficulty: question.difficulty || 'Medium',
+    tags: question.tags || [],
+    language: question.language || 'English',
+    image_required: question.image_required || false
+  });
+
   const handleAddQuestion = async (question, index) => {
     try {
-      // Convert the question to the expected format
-      const questionData = {
-        question: question.question,
-        question_type: question.question_type || question.type || 'MCQ',
-        solution: question.solution || question.answer || '',
-        difficulty: question.difficulty || 'Medium',
-        tags: question.tags || [],
-        language: question.language || 'English',
-        image_required: question.image_required || false
-      };
-
-      await onAddQuestion(questionData);
+      await onAddQuestion(toQuestionData(question));
       setAddedQuestions(prev => new Set([...prev, index]));
     } catch (error) {
       toast.error('Failed to add question');
     }
   };
 
+  const handleAddAll = async () => {
+    const pendingIndexes = questions
+      .map((_, index) => index)
+      .filter(index => !addedQuestions.has(index));
+    if (pendingIndexes.length === 0) {
+      return;
+    }
+
+    try {
+      const result = await onAddQuestions(pendingIndexes.map(index => toQuestionData(questions[index])));
+      // Results come back in request order; map them back to generated question indexes
+      const insertedIndexes = result.results
+        .filter(item => item.status === 'inserted')
+        .map(item => pendingIndexes[item.index]);
+      setAddedQuestions(prev => new Set([...prev, ...insertedIndexes]));
+    } catch (error) {
+      // Errors are reported by the parent handler
+    }
+  };
+
   const toggleSolution = (index) => {
     setShowSolutions(prev => ({
       ...prev,
@@ -61,13 +81,7 @@ const GeneratedQuestions = ({ questions, onAddQuestion, onClearGenerated }) => {
         <div>
           <button
             className="btn btn-success"
-            onClick={() => {
-              questions.forEach((question, index) => {
-                if (!addedQuestions.has(index)) {
-                  handleAddQuestion(question, index);
-                }
-              });
-            }}
+            onClick={handleAddAll}
             disabled={addedQuestions.size === questions.length}
           >
             Add All Questions
@@ -139,6 +153,25 @@ const GeneratedQuestions = ({ questions, onAddQuestion, onClearGenerated }) => {
                 </div>
               )}
 
+              {question.similar_questions && question.similar_questions.length > 0 && (
+                <div style={{
+                  marginBottom: '12px',
+                  padding: '8px',
+                  backgroundColor: question.possible_duplicate ? '#fff3cd' : '#f8f9fa',
+                  borderRadius: '4px',
+                  fontSize: '14px'
+                }}>
+                  <strong>{question.possible_duplicate ? 'Possible duplicate of:' : 'Similar existing questions:'}</strong>
+                  <ul style={{ margin: '4px 0 0', paddingLeft: '20px' }}>
+                    {question.similar_questions.map((match) => (
+                      <li key={match.question_id}>
+                        #{match.question_id}: {match.question} (distance {match.distance.toFixed(3)})
+                      </li>
+                    ))}
+                  </ul>
+                </div>
+              )}
+
               {question.language && question.language !== 'English' && (
                 <div style={{ marginBottom: '8px' }}>
                   <strong>Language:</strong> {question.language}
@@ -176,13 +209,7 @@ const GeneratedQuestions = ({ questions, onAddQuestion, onClearGenerated }) => {
         }}>
           <button
             className="btn btn-success"
-            onClick={() => {
-              questions.forEach((question, index) => {
-                if (!addedQuestions.has(index)) {
-                  handleAddQuestion(question, index);
-                }
-              });
-            }}
+            onClick={handleAddAll}
             disabled={addedQuestions.size === questions.length}
           >
             Add All Remaining Questions ({questions.length - addedQuestions.size})
@@ -3,31 +3,33 @@ import { AlertTriangle, Trash2, Settings } from 'lucide-react';
 import { questionService } from '../services/questionService';
 
 const RedundantQuestions = ({ redundantQuestions, onDelete }) => {
-  const [threshold, setThreshold] = useState(0.8);
+  const [threshold, setThreshold] = useState(0.3);
   const [maxResults, setMaxResults] = useState(2);
+  const [method, setMethod] = useState('vector');
   const [loading, setLoading] = useState(false);
   const [localRedundantQuestions, setLocalRedundantQuestions] = useState(redundantQuestions || []);
   const [questionDetails, setQuestionDetails] = useState({});
+  const [questionGroups, setQuestionGroups] = useState({});
 
   const handleCheckRedundancy = async () => {
     try {
       setLoading(true);
-      const result = await questionService.checkRedundancy(threshold, maxResults);
+      const result = await questionService.checkRedundancy(threshold, maxResults, method);
       setLocalRedundantQuestions(result.redundant_question_ids || []);
       
-      // Fetch details for each redundant question
+      // Question details and duplicate groups come back with the report
       const details = {};
-      for (const questionId of result.redundant_question_ids || []) {
-        try {
-          const questionDetail = await questionService.getQuestion(questionId);
-          if (questionDetail.question) {
-            details[questionId] = questionDetail.question;
-          }
-        } catch (error) {
-          console.error(`Failed to fetch question ${questionId}:`, error);
-        }
-      }
+      const groups = {};
+      (result.clusters || []).forEach((cluster, clusterIndex) => {
+        cluster.question_ids.forEach(questionId => {
+          groups[questionId] = clusterIndex + 1;
+        });
+        (cluster.questions || []).forEach(question => {
+          details[String(question.question_id)] = question;
+        });
+      });
       setQuestionDetails(details);
+      setQuestionGroups(groups);
     } catch (error) {
       alert('Failed to check redundancy: ' + error.message);
     } finally {
@@ -65,10 +67,10 @@ const RedundantQuestions = ({ redundantQuestions, onDelete }) => {
         
         <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fit, minmax(200px, 1fr))', gap: '16px', marginBottom: '16px' }}>
           <div className="form-group" style={{ margin: 0 }}>
-            <label className="form-label">Similarity Threshold</label>
+            <label className="form-label">Distance Threshold</label>
             <input
               type="range"
-              min="0.5"
+              min="0.05"
               max="1.0"
               step="0.05"
               value={threshold}
@@ -76,7 +78,7 @@ const RedundantQuestions = ({ redundantQuestions, onDelete }) => {
               className="form-control"
             />
             <div style={{ fontSize: '12px', color: '#666', marginTop: '4px' }}>
-              Current: {threshold} (Higher = more strict)
+              Current: {threshold} (Lower = more strict)
             </div>
           </div>
           
@@ -93,6 +95,19 @@ const RedundantQuestions = ({ redundantQuestions, onDelete }) => {
               <option value={10}>10</option>
             </select>
           </div>
+
+          <div className="form-group" style={{ margin: 0 }}>
+            <label className="form-label">Detection Method</label>
+            <select
+              value={method}
+              onChange={(e) => setMethod(e.target.value)}
+              className="form-control"
+            >
+              <option value="vector">Vector similarity</option>
+              <option value="minhash">Text overlap (MinHash)</option>
+              <option value="graph">Detected on save</option>
+            </select>
+          </div>
         </div>
 
         <button
@@ -163,13 +178,14 @@ const RedundantQuestions = ({ redundantQuestions, onDelete }) => {
                   }}>
                     <div>
                       <div className="similarity-score">
+                        {questionGroups[questionId] && `Duplicate group #${questionGroups[questionId]} · `}
                         Question ID: {questionId}
                       </div>
                       {question && (
                         <>
                           <div className="question-meta" style={{ marginBottom: '8px' }}>
                             <span className="badge badge-type">
-                              {question.question_type}
+                              {question.question_type || question.type}
                             </span>
                             <span className={`badge ${getDifficultyClass(question.difficulty)}`}>
                               {question.difficulty}
@@ -245,10 +261,12 @@ const RedundantQuestions = ({ redundantQuestions, onDelete }) => {
           }}>
             <strong>How redundancy detection works:</strong>
             <ul style={{ marginTop: '8px', paddingLeft: '20px' }}>
-              <li>Questions are compared using vector similarity in the vector database</li>
-              <li>Similarity threshold determines how similar questions need to be to be flagged</li>
-              <li>Higher threshold (closer to 1.0) = more strict, only very similar questions flagged</li>
-              <li>Lower threshold (closer to 0.5) = less strict, more questions flagged as potentially redundant</li>
+              <li>Questions are compared using vector similarity in the vector database, or by overlapping question text with the MinHash method</li>
+              <li>"Detected on save" shows near-duplicates recorded whenever a question is added or edited, without rescanning the bank; questions saved before it was enabled appear after a duplicate graph backfill</li>
+              <li>Distance threshold determines how close questions need to be to be flagged; for MinHash the distance is 1 - text overlap</li>
+              <li>Lower threshold (closer to 0) = more strict, only very similar questions flagged</li>
+              <li>Higher threshold (closer to 1.0) = less strict, more questions flagged as potentially redundant</li>
+              <li>"Detected on save" only records pairs within the server's duplicate distance (0.3 by default), so higher thresholds add nothing there</li>
             </ul>
           </div>
         </div>
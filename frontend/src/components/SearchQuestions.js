@@ -9,6 +9,7 @@ const SearchQuestions = ({ selectedQuestions = [], onQuestionSelect }) => {
   const [loading, setLoading] = useState(false);
   const [searchPerformed, setSearchPerformed] = useState(false);
   const [limit, setLimit] = useState(10);
+  const [fuzzy, setFuzzy] = useState(false);
 
   const handleSearch = async (e) => {
     e.preventDefault();
@@ -21,7 +22,11 @@ const SearchQuestions = ({ selectedQuestions = [], onQuestionSelect }) => {
     try {
       setLoading(true);
       setSearchPerformed(true);
-      const result = await questionService.searchQuestions(searchQuery.trim(), limit);
+      const result = await questionService.searchQuestions(
+        searchQuery.trim(),
+        limit,
+        fuzzy ? 'fuzzy' : 'fulltext'
+      );
       setSearchResults(result.results || []);
     } catch (error) {
       console.error('Search error:', error);
@@ -86,6 +91,15 @@ const SearchQuestions = ({ selectedQuestions = [], onQuestionSelect }) => {
             </select>
           </div>
 
+          <label style={{ display: 'flex', alignItems: 'center', gap: '6px', fontSize: '14px' }}>
+            <input
+              type="checkbox"
+              checked={fuzzy}
+              onChange={(e) => setFuzzy(e.target.checked)}
+            />
+            Typo tolerant
+          </label>
+
           {searchPerformed && (
             <button
               type="button"
@@ -154,6 +168,9 @@ const SearchQuestions = ({ selectedQuestions = [], onQuestionSelect }) => {
                   <span>
                     Text search: {searchResults.filter(q => q.search_source === 'sql').length}
                   </span>
+                  <span>
+                    Both: {searchResults.filter(q => q.search_source === 'both').length}
+                  </span>
                 </div>
               )}
 
@@ -199,7 +216,7 @@ const SearchQuestions = ({ selectedQuestions = [], onQuestionSelect }) => {
               <li>Semantic similarity search using vector database</li>
               <li>Text-based keyword matching</li>
               <li>Search in questions, solutions, and tags</li>
-              <li>Combined results from multiple search methods</li>
+              <li>Results from both methods merged by rank fusion</li>
             </ul>
           </div>
         </div>
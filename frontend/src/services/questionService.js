@@ -26,6 +26,12 @@ export const questionService = {
     return response.data;
   },
 
+  // Add many questions to the database in one request
+  addQuestions: async (questions) => {
+    const response = await api.post('/add-questions', { questions });
+    return response.data;
+  },
+
   // Delete a question
   deleteQuestion: async (questionId) => {
     const response = await api.post('/delete-question', { question_id: questionId });
@@ -45,7 +51,7 @@ export const questionService = {
   },
 
   // Get all questions
-  getAllQuestions: async (limit = null, offset = 0) => {
+  getAllQuestions: async (limit = null, offset = 0, cursor = null) => {
     const params = new URLSearchParams();
     if (limit !== null) {
       params.append('limit', limit.toString());
@@ -53,13 +59,16 @@ export const questionService = {
     if (offset > 0) {
       params.append('offset', offset.toString());
     }
+    if (cursor) {
+      params.append('cursor', cursor);
+    }
     
     const response = await api.get(`/get-all-questions?${params.toString()}`);
     return response.data;
   },
 
   // Filter questions
-  filterQuestions: async (filters = {}, limit = null, offset = 0) => {
+  filterQuestions: async (filters = {}, limit = null, offset = 0, cursor = null) => {
     const params = new URLSearchParams();
     
     if (filters.tags && filters.tags.length > 0) {
@@ -80,6 +89,9 @@ export const questionService = {
     if (offset > 0) {
       params.append('offset', offset.toString());
     }
+    if (cursor) {
+      params.append('cursor', cursor);
+    }
     
     const response = await api.get(`/filter-questions?${params.toString()}`);
     return response.data;
@@ -156,10 +168,11 @@ export const questionService = {
   },
 
   // Search questions
-  searchQuestions: async (query, limit = 10) => {
+  searchQuestions: async (query, limit = 10, mode = 'fulltext') => {
     const formData = new FormData();
     formData.append('query', query);
     formData.append('limit', limit.toString());
+    formData.append('mode', mode);
     
     const response = await axios.post(`${API_BASE_URL}/search-questions`, formData, {
       headers: {
@@ -170,10 +183,11 @@ export const questionService = {
   },
 
   // Check for redundant questions
-  checkRedundancy: async (threshold = 0.8, n = 2) => {
+  checkRedundancy: async (threshold = 0.3, n = 2, method = 'vector') => {
     const response = await api.post('/find-redundant-questions', {
       threshold,
-      n
+      n,
+      method
     });
     return response.data;
   },